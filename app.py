@@ -1,30 +1,85 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, g, has_request_context, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-import qrcode
+from sqlalchemy import bindparam, event, or_
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+from qr_render import QR_RENDER_PARAMS, QR_RENDERERS, render_qr_png
 import io
 import base64
+import hashlib
+import json
+import multiprocessing
+import re
+import zipfile
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
 from datetime import datetime
 import os
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-import pandas as pd
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import groupby
+# pandas va openpyxl og'ir kutubxonalar: ular faqat import/eksport funksiyalari ichida
+# birinchi ishlatilganda yuklanadi (ilova va har bir ishchi tezroq ishga tushadi)
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///inventory.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('INVENTORY_DATABASE_URI', 'sqlite:///inventory.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Ulanishlar qayta ishlatiladi: PRAGMA lar va sahifa keshi saqlanib qoladi.
+# Xotiradagi SQLite (sqlite:// yoki :memory:) bitta ulanishli pool ishlatadi - bu parametrlarni qabul qilmaydi.
+if make_url(app.config['SQLALCHEMY_DATABASE_URI']).database not in (None, '', ':memory:'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 10, 'max_overflow': 20}
 app.config['SECRET_KEY'] = 'your-secret-key-here'
+app.config['IMPORT_CHUNK_SIZE'] = 1000  # Excel importda bitta executemany dagi qatorlar soni
+app.config['IMPORT_WORKERS'] = 2  # Fon rejimidagi Excel import oqimlari soni
+app.config['QR_CACHE_DIR'] = os.path.join(app.instance_path, 'qr_cache')
+app.config['QR_CACHE_MAX_BYTES'] = 64 * 1024 * 1024  # QR kesh hajmi chegarasi (LRU bo'yicha tozalanadi)
+# QR kodlarni parallel chizuvchi jarayonlar soni (bitta ishchi jarayon uchun; gunicorn da
+# yadrolar ishchilar orasida bo'linadi - gunicorn.conf.py). INVENTORY_QR_WORKERS bilan berish mumkin
+app.config['QR_WORKERS'] = int(os.environ.get('INVENTORY_QR_WORKERS', os.cpu_count() or 1))
+# Pool jarayonlari ko'p oqimli ishchidan fork qilinmaydi (ochiq SQLite ulanishlari va qulflar nusxalanmasin)
+app.config['QR_START_METHOD'] = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+app.config['QR_PARALLEL_MIN_BATCH'] = 16  # Bundan kam QR kod jarayonlar pool isiz chiziladi
+app.config['HIERARCHY_CACHE_SIZE'] = 20000  # Keshdagi tashkilot/qavat/xona yozuvlari soni (LRU bo'yicha chiqariladi)
+app.config['METRICS_ENABLED'] = os.environ.get('INVENTORY_METRICS') == '1'  # /metrics va Server-Timing (ixtiyoriy)
+# Har bir yangi SQLite ulanishida o'rnatiladigan PRAGMA lar (tartib muhim: journal_mode birinchi)
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': 'WAL',  # O'quvchilar yozuvchini, yozuvchi o'quvchilarni bloklamaydi
+    'synchronous': 'NORMAL',  # WAL da xavfsiz: baza buzilmaydi, elektr uzilsa oxirgi tranzaksiyalar yo'qolishi mumkin
+    'busy_timeout': 5000,  # Yozish navbati uchun kutish (ms), darhol "database is locked" o'rniga
+    'cache_size': -32000,  # Ulanish boshiga sahifa keshi, KiB (manfiy qiymat)
+    'mmap_size': 256 * 1024 * 1024,  # Bazani xotiraga akslantirib o'qish
+    'temp_store': 'MEMORY'  # Saralash va vaqtinchalik jadvallar xotirada
+}
 
 db = SQLAlchemy(app)
 CORS(app)
 
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """SQLite ulanishiga PRAGMA larni o'rnatish"""
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        @event.listens_for(db.engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, app.config['SQLITE_PRAGMAS'])
+
+# Excel importlarni HTTP so'rovdan tashqarida bajarish uchun
+import_executor = ThreadPoolExecutor(max_workers=app.config['IMPORT_WORKERS'])
+
 # Ma'lumotlar bazasi modellari
 class Organization(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     has_floors = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # ETag: qavat/xona/jihozlari o'zgarsa oshadi
     
     floors = db.relationship('Floor', backref='organization', lazy=True, cascade='all, delete-orphan')
     rooms = db.relationship('Room', backref='organization', lazy=True, cascade='all, delete-orphan')
@@ -34,6 +89,11 @@ class Floor(db.Model):
     name = db.Column(db.String(100), nullable=False)
     organization_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # ETag: xona/jihozlari o'zgarsa oshadi
+    
+    __table_args__ = (
+        db.Index('ix_floor_organization_id', 'organization_id'),
+    )
     
     rooms = db.relationship('Room', backref='floor', lazy=True, cascade='all, delete-orphan')
 
@@ -43,6 +103,13 @@ class Room(db.Model):
     organization_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False)
     floor_id = db.Column(db.Integer, db.ForeignKey('floor.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # ETag: jihozlari o'zgarsa oshadi
+    
+    # Tashkilot sahifasi (qavatsiz xonalar: organization_id + floor_id IS NULL) va qavat sahifasi
+    __table_args__ = (
+        db.Index('ix_room_organization_floor', 'organization_id', 'floor_id'),
+        db.Index('ix_room_floor_id', 'floor_id'),
+    )
     
     equipment = db.relationship('Equipment', backref='room', lazy=True, cascade='all, delete-orphan')
 
@@ -59,6 +126,18 @@ class Equipment(db.Model):
     description = db.Column(db.Text)
     room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # ETag: jihoz yoki transfer tarixi o'zgarsa oshadi
+    
+    # Xona sahifasidagi ro'yxat: xona bo'yicha filtr + saralash maydoni (id SQLite da indeksga avtomatik kiradi)
+    __table_args__ = (
+        db.Index('ix_equipment_room_inv_code', 'room_id', 'inv_code'),
+        db.Index('ix_equipment_room_name', 'room_id', 'name'),
+        db.Index('ix_equipment_room_category', 'room_id', 'category'),
+        db.Index('ix_equipment_room_status', 'room_id', 'status'),
+        db.Index('ix_equipment_room_created_at', 'room_id', 'created_at'),
+        # Skaner orqali seriya raqami bo'yicha qidirish (inv_code uchun unique indeks yetarli)
+        db.Index('ix_equipment_serial_number', 'serial_number'),
+    )
     
     # Transfer tarixi bilan bog'lanish
     transfer_history = db.relationship('TransferHistory', backref='equipment', lazy=True, cascade='all, delete-orphan')
@@ -73,15 +152,671 @@ class TransferHistory(db.Model):
     transfer_date = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text)
     
+    # Jihoz tarixi (sana bo'yicha tartiblangan) va xona o'chirilganda from/to bo'yicha o'chirish
+    __table_args__ = (
+        db.Index('ix_transfer_history_equipment_date', 'equipment_id', 'transfer_date'),
+        db.Index('ix_transfer_history_from_room_id', 'from_room_id'),
+        db.Index('ix_transfer_history_to_room_id', 'to_room_id'),
+    )
+    
     # Xonalar bilan bog'lanish
     from_room = db.relationship('Room', foreign_keys=[from_room_id], backref='transfers_from')
     to_room = db.relationship('Room', foreign_keys=[to_room_id], backref='transfers_to')
 
+# Inventarizatsiya kodlari uchun ketma-ketlik (har bir "TASHKILOT-XONA" prefiksi uchun)
+class InvCodeSequence(db.Model):
+    prefix = db.Column(db.String(50), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+
+# Fon rejimidagi Excel import vazifalari
+class ImportJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    organization_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, running, done, failed
+    rows_processed = db.Column(db.Integer, default=0)
+    imported_count = db.Column(db.Integer, default=0)
+    error_count = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Text, default='')  # Har bir xatolik alohida qatorda
+    message = db.Column(db.Text)
+    worker_pid = db.Column(db.Integer)  # Vazifani bajarayotgan jarayon (gunicorn ishchisi)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+# Jihozlar soni: tashkilot/qavat/xona x kategoriya x holat (dashboardlar jihozlar jadvalini skanerlamaydi).
+# Jihoz qo'shilganda, o'zgarganda, ko'chirilganda va o'chirilganda shu tranzaksiya ichida yangilanadi.
+class InventorySummary(db.Model):
+    __tablename__ = 'inventory_summary'
+    scope = db.Column(db.String(20), primary_key=True)  # organization, floor, room
+    scope_id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)  # Holat ko'rsatilmagan bo'lsa ''
+    equipment_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Tashkilot bo'yicha hisobot kesimlari: brend, qo'shilgan oy va oylik transferlar soni.
+# InventorySummary bilan bir xil yo'llarda (shu tranzaksiya ichida) yangilanadi.
+class InventoryBreakdown(db.Model):
+    __tablename__ = 'inventory_breakdown'
+    dimension = db.Column(db.String(20), primary_key=True)  # brand, month, transfer_month
+    organization_id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.String(100), primary_key=True)  # Brend yoki 'YYYY-MM' (ko'rsatilmagan bo'lsa '')
+    equipment_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Ierarxiya keshi avlodi (bitta qator): tashkilot/qavat/xona o'chirilganda oshiriladi,
+# boshqa jarayonlar (gunicorn ishchilari) o'z keshlarini shu qiymat bo'yicha tozalaydi
+class HierarchyGeneration(db.Model):
+    __tablename__ = 'hierarchy_generation'
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+def inv_code_prefix(org_name, room_name):
+    """Inventarizatsiya kodi prefiksini yaratish: TASHKILOT-XONA"""
+    return f"{org_name[:3].upper()}-{room_name[:3].upper()}"
+
+def allocate_inv_codes(prefix, count=1):
+    """Prefiks uchun ketma-ket `count` ta yangi inventarizatsiya kodini ajratish
+
+    Ketma-ketlik bitta atomar UPDATE ... RETURNING bilan oshiriladi, shuning uchun
+    xonadagi jihozlar sonidan qat'i nazar bitta indeksli yozuv bajariladi va
+    o'chirilgan jihozlar kodlari qayta ishlatilmaydi. Ajratish joriy tranzaksiya
+    ichida bajariladi - commit qilinmasa, kodlar ham qaytariladi. Ajratilgan blokdagi
+    kod bazada allaqachon bo'lsa, blok saqlangan eng katta raqamdan keyinga suriladi.
+    """
+    if count < 1:
+        return []
+    
+    last_value = db.session.execute(
+        db.update(InvCodeSequence)
+        .where(InvCodeSequence.prefix == prefix)
+        .values(last_value=InvCodeSequence.last_value + count)
+        .returning(InvCodeSequence.last_value)
+    ).scalar()
+    
+    if last_value is None:
+        # Prefiks birinchi marta ishlatilmoqda - mavjud kodlardan boshlang'ich qiymatni olish
+        last_value = db.session.execute(
+            sqlite_insert(InvCodeSequence)
+            .values(prefix=prefix, last_value=stored_inv_code_max(prefix) + count)
+            .on_conflict_do_update(
+                index_elements=[InvCodeSequence.prefix],
+                set_={'last_value': InvCodeSequence.last_value + count}
+            )
+            .returning(InvCodeSequence.last_value)
+        ).scalar()
+    
+    codes = inv_code_range(prefix, last_value, count)
+    if db.session.query(Equipment.id).filter(Equipment.inv_code.in_(codes)).first():
+        # Ketma-ketlik undan tashqari yozilgan kodlardan orqada qolgan (masalan, eski
+        # versiyadagi import) - saqlangan eng katta raqamdan keyingi blokni olish
+        last_value = db.session.execute(
+            db.update(InvCodeSequence)
+            .where(InvCodeSequence.prefix == prefix)
+            .values(last_value=stored_inv_code_max(prefix) + count)
+            .returning(InvCodeSequence.last_value)
+        ).scalar()
+        codes = inv_code_range(prefix, last_value, count)
+    
+    return codes
+
+def inv_code_range(prefix, last_value, count):
+    return [f"{prefix}-{number:04d}" for number in range(last_value - count + 1, last_value + 1)]
+
+INV_CODE_PATTERN = re.compile(r'^(.+)-(\d{1,18})$')
+
+def stored_inv_code_max(prefix):
+    """Bazadagi `prefix-RAQAM` kodlaridagi eng katta raqam (kod bo'lmasa 0)"""
+    # 'prefix-' <= kod < 'prefix.' oralig'i ('.' - '-' dan keyingi belgi) inv_code
+    # indeksidan o'qiladi, LIKE esa katta-kichik harfni farqlamaydi va jadvalni skanerlaydi
+    codes = db.session.query(Equipment.inv_code).filter(
+        Equipment.inv_code >= f"{prefix}-", Equipment.inv_code < f"{prefix}."
+    )
+    top = 0
+    for (code,) in codes:
+        match = INV_CODE_PATTERN.match(code)
+        if match and match.group(1) == prefix:
+            top = max(top, int(match.group(2)))
+    return top
+
+def advance_inv_code_sequences(codes):
+    """Ajratuvchidan tashqari yoziladigan kodlar (masalan, Excel dagi) uchun ketma-ketliklarni surish
+
+    Har bir `PREFIKS-RAQAM` kodi uchun last_value = max(last_value, RAQAM), shunda
+    allocate_inv_codes bu kodlarni qayta bermaydi. Kod yozilgan tranzaksiyada chaqiriladi.
+    """
+    top = {}
+    for code in codes:
+        match = INV_CODE_PATTERN.match(code)
+        if match:
+            prefix, number = match.group(1), int(match.group(2))
+            top[prefix] = max(top.get(prefix, 0), number)
+    if not top:
+        return
+    
+    # Yangi prefikslar ketma-ketligi bazadagi kodlardan boshlanadi (allocate_inv_codes dagi kabi)
+    known = {
+        prefix for (prefix,) in db.session.query(InvCodeSequence.prefix).filter(InvCodeSequence.prefix.in_(list(top)))
+    }
+    for prefix in top.keys() - known:
+        top[prefix] = max(top[prefix], stored_inv_code_max(prefix))
+    
+    upsert = sqlite_insert(InvCodeSequence)
+    db.session.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[InvCodeSequence.prefix],
+            set_={'last_value': db.func.max(InvCodeSequence.last_value, upsert.excluded.last_value)}
+        ),
+        [{'prefix': prefix, 'last_value': last_value} for prefix, last_value in top.items()]
+    )
+
+SUMMARY_SCOPES = ('organization', 'floor', 'room')
+SUMMARY_KEYS = ['scope', 'scope_id', 'category', 'status']
+BREAKDOWN_DIMENSIONS = ('brand', 'month', 'transfer_month')
+BREAKDOWN_KEYS = ['dimension', 'organization_id', 'value']
+
+def created_month(value):
+    """Sana -> 'YYYY-MM' (hisobotlardagi oy guruhi; sana yo'q bo'lsa '')"""
+    return value.strftime('%Y-%m') if value else ''
+
+def month_of(column):
+    """created_month ning SQL dagi ekvivalenti"""
+    return db.func.coalesce(db.func.strftime('%Y-%m', column), '')
+
+def inventory_group(equipment, room_id=None):
+    """Jihozning yig'ma jadvallardagi guruhi: (xona, kategoriya, holat, brend, qo'shilgan oy)"""
+    return (room_id or equipment.room_id, equipment.category, equipment.status,
+            equipment.brand, created_month(equipment.created_at))
+
+def upsert_counts(model, key_columns, changes):
+    """Yig'ma jadvalga {kalit: +/-son} o'zgarishlarini qo'shish (joriy tranzaksiya ichida)
+
+    Har bir guruh bitta upsert (executemany) bilan o'zgaradi, nolga tushgan guruhlar o'chiriladi.
+    """
+    rows = [dict(zip(key_columns, key), equipment_count=delta) for key, delta in changes.items() if delta]
+    if not rows:
+        return
+    
+    upsert = sqlite_insert(model)
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={'equipment_count': model.equipment_count + upsert.excluded.equipment_count}
+    ), rows)
+    
+    decreased = [row for row in rows if row['equipment_count'] < 0]
+    if decreased:
+        table = model.__table__
+        db.session.execute(table.delete().where(
+            *(table.c[column] == bindparam(column) for column in key_columns),
+            table.c.equipment_count <= 0
+        ), decreased)
+
+def apply_summary_deltas(deltas):
+    """InventorySummary ga o'zgarishlar: {(organization_id, floor_id, room_id, category, status): +/-son}.
+    floor_id yoki room_id None bo'lsa, o'sha daraja yangilanmaydi."""
+    changes = Counter()
+    for (organization_id, floor_id, room_id, category, status), delta in deltas.items():
+        for scope, scope_id in zip(SUMMARY_SCOPES, (organization_id, floor_id, room_id)):
+            if scope_id is not None:
+                changes[scope, scope_id, category, status or ''] += delta
+    upsert_counts(InventorySummary, SUMMARY_KEYS, changes)
+
+def apply_breakdown_deltas(deltas):
+    """InventoryBreakdown ga o'zgarishlar: {(dimension, organization_id, value): +/-son}"""
+    upsert_counts(InventoryBreakdown, BREAKDOWN_KEYS, Counter({
+        (dimension, organization_id, value or ''): delta
+        for (dimension, organization_id, value), delta in deltas.items()
+    }))
+
+def room_parents_query(room_ids):
+    return db.session.query(Room.id, Room.organization_id, Room.floor_id).filter(Room.id.in_(room_ids))
+
+def update_inventory_summary(changes):
+    """Jihozlar o'zgarishlarini yig'ma jadvallarga yozish
+
+    changes: {inventory_group(...): +/-son}; xonalarning tashkilot va qavati
+    bitta so'rov bilan olinadi.
+    """
+    room_ids = {group[0] for group in changes}
+    if not room_ids:
+        return
+    parents = {
+        room_id: (organization_id, floor_id)
+        for room_id, organization_id, floor_id in room_parents_query(room_ids)
+    }
+    summary = Counter()
+    breakdown = Counter()
+    for (room_id, category, status, brand, month), delta in changes.items():
+        organization_id, floor_id = parents[room_id]
+        summary[organization_id, floor_id, room_id, category, status] += delta
+        breakdown['brand', organization_id, brand or ''] += delta
+        breakdown['month', organization_id, month] += delta
+    apply_summary_deltas(summary)
+    apply_breakdown_deltas(breakdown)
+
+def remove_rooms_from_summary(room_ids):
+    """O'chiriladigan xonalar jihozlarini yig'ma jadvallardan ayirish va xona yozuvlarini o'chirish
+
+    room_ids - xonalar id lari subquery si. Tashkilot/qavat sonlari xona yozuvlaridan,
+    brend/oy sonlari esa o'chiriladigan jihozlarning guruhlangan so'rovidan ayiriladi.
+    """
+    apply_summary_deltas({
+        (organization_id, floor_id, None, category, status): -count
+        for organization_id, floor_id, category, status, count in room_summary_totals(room_ids)
+    })
+    db.session.execute(room_summary_delete(room_ids), execution_options={'synchronize_session': False})
+    
+    breakdown = Counter()
+    for organization_id, brand_value, month_value, count in room_breakdown_totals(room_ids):
+        breakdown['brand', organization_id, brand_value] -= count
+        breakdown['month', organization_id, month_value] -= count
+    apply_breakdown_deltas(breakdown)
+
+def room_summary_totals(room_ids):
+    """Xonalar yig'ma yozuvlari tashkilot/qavat, kategoriya va holat bo'yicha"""
+    return (
+        db.session.query(Room.organization_id, Room.floor_id, InventorySummary.category,
+                         InventorySummary.status, db.func.sum(InventorySummary.equipment_count))
+        .join(Room, Room.id == InventorySummary.scope_id)
+        .filter(InventorySummary.scope == 'room', InventorySummary.scope_id.in_(room_ids))
+        .group_by(Room.organization_id, Room.floor_id, InventorySummary.category, InventorySummary.status)
+    )
+
+def room_summary_delete(room_ids):
+    return db.delete(InventorySummary).where(InventorySummary.scope == 'room', InventorySummary.scope_id.in_(room_ids))
+
+def room_breakdown_totals(room_ids):
+    """Xonalardagi jihozlar soni tashkilot, brend va qo'shilgan oy bo'yicha"""
+    brand = db.func.coalesce(Equipment.brand, '')
+    month = month_of(Equipment.created_at)
+    return (
+        db.session.query(Room.organization_id, brand, month, db.func.count(Equipment.id))
+        .join(Room, Room.id == Equipment.room_id)
+        .filter(Equipment.room_id.in_(room_ids))
+        .group_by(Room.organization_id, brand, month)
+    )
+
+def remove_transfers_from_breakdown(*criteria):
+    """O'chiriladigan transfer yozuvlarini (criteria ga mos) oylik transfer sonlaridan ayirish"""
+    apply_breakdown_deltas({
+        ('transfer_month', organization_id, month_value): -count
+        for organization_id, month_value, count in transfer_month_totals(*criteria)
+    })
+
+def transfer_month_totals(*criteria):
+    """Transfer yozuvlari soni (criteria ga mos) tashkilot va oy bo'yicha"""
+    month = month_of(TransferHistory.transfer_date)
+    return (
+        db.session.query(Room.organization_id, month, db.func.count(TransferHistory.id))
+        .join(Room, Room.id == TransferHistory.to_room_id)
+        .filter(*criteria)
+        .group_by(Room.organization_id, month)
+    )
+
+def summary_sources():
+    """Yig'ma jadvallar va ularning asl jadvallardan hisoblangan SELECT lari (qayta qurish va tekshirish uchun).
+    SELECT ustunlari jadvalning kalit ustunlari tartibida, oxirida equipment_count."""
+    status = db.func.coalesce(Equipment.status, '')
+    for scope, column in zip(SUMMARY_SCOPES, (Room.organization_id, Room.floor_id, Room.id)):
+        yield InventorySummary, (
+            db.select(db.literal(scope).label('scope'), column.label('scope_id'), Equipment.category.label('category'),
+                      status.label('status'), db.func.count(Equipment.id).label('equipment_count'))
+            .select_from(Equipment)
+            .join(Room, Room.id == Equipment.room_id)
+            .where(column.isnot(None))
+            .group_by(column, Equipment.category, status)
+        )
+    
+    for dimension, column in (('brand', db.func.coalesce(Equipment.brand, '')), ('month', month_of(Equipment.created_at))):
+        yield InventoryBreakdown, (
+            db.select(db.literal(dimension).label('dimension'), Room.organization_id.label('organization_id'),
+                      column.label('value'), db.func.count(Equipment.id).label('equipment_count'))
+            .select_from(Equipment)
+            .join(Room, Room.id == Equipment.room_id)
+            .group_by(Room.organization_id, column)
+        )
+    
+    transfer_month = month_of(TransferHistory.transfer_date)
+    yield InventoryBreakdown, (
+        db.select(db.literal('transfer_month').label('dimension'), Room.organization_id.label('organization_id'),
+                  transfer_month.label('value'), db.func.count(TransferHistory.id).label('equipment_count'))
+        .select_from(TransferHistory)
+        .join(Room, Room.id == TransferHistory.to_room_id)
+        .group_by(Room.organization_id, transfer_month)
+    )
+
+def rebuild_inventory_summary():
+    """Yig'ma jadvallarni jihozlar va transfer tarixidan to'liq qayta qurish (commit chaqiruvchi tomonidan)"""
+    db.session.execute(db.delete(InventorySummary))
+    db.session.execute(db.delete(InventoryBreakdown))
+    for model, query in summary_sources():
+        db.session.execute(model.__table__.insert().from_select(list(query.selected_columns.keys()), query))
+
+def inventory_summary_differences():
+    """Yig'ma jadvallar va asl jadvallar orasidagi farqlar: [((jadval, *kalit), kutilgan, saqlangan)]"""
+    expected = Counter()
+    for model, query in summary_sources():
+        for *key, count in db.session.execute(query):
+            expected[(model.__tablename__, *key)] = count
+    stored = Counter()
+    for model in (InventorySummary, InventoryBreakdown):
+        key_columns = list(model.__table__.primary_key.columns)
+        for *key, count in db.session.execute(db.select(*key_columns, model.equipment_count)):
+            stored[(model.__tablename__, *key)] = count
+    return [
+        (key, expected[key], stored[key])
+        for key in sorted(expected.keys() | stored.keys(), key=str)
+        if expected[key] != stored[key]
+    ]
+
 # Asosiy sahifa
+def room_counts_by(column, *criteria):
+    """Xonalar soni, column (Room ustuni) bo'yicha guruhlangan subquery (criteria - faqat kerakli xonalar)"""
+    return (
+        db.select(column.label('group_id'), db.func.count(Room.id).label('room_count'))
+        .where(*criteria)
+        .group_by(column)
+        .subquery()
+    )
+
+def equipment_counts_by(scope, ids=None):
+    """Jihozlar soni yig'ma jadvaldan, scope (organization/floor/room) id lari bo'yicha guruhlangan subquery
+    (ids - faqat kerakli id lar subquery si). Jihozlar jadvali o'qilmaydi."""
+    criteria = [InventorySummary.scope == scope]
+    if ids is not None:
+        criteria.append(InventorySummary.scope_id.in_(ids))
+    return (
+        db.select(InventorySummary.scope_id.label('group_id'),
+                  db.func.sum(InventorySummary.equipment_count).label('equipment_count'))
+        .where(*criteria)
+        .group_by(InventorySummary.scope_id)
+        .subquery()
+    )
+
+def counts_query(query, key, *subqueries):
+    """Asosiy so'rovga guruhlangan sonlarni LEFT JOIN qilish (har bir subquery - bitta son ustuni)"""
+    for subquery in subqueries:
+        query = query.outerjoin(subquery, subquery.c.group_id == key)
+        column = [c for c in subquery.c if c.name != 'group_id'][0]
+        query = query.add_columns(db.func.coalesce(column, 0).label(column.name))
+    return query
+
+def with_counts(query):
+    """counts_query natijasini o'qish: (obyektlar ro'yxati, {id: {'room_count': .., ...}})"""
+    columns = [description['name'] for description in query.column_descriptions[1:]]
+    items = []
+    counts = {}
+    for row in query:
+        item = row[0]
+        items.append(item)
+        counts[item.id] = dict(zip(columns, row[1:]))
+    return items, counts
+
+def organization_floors_query(org_id):
+    """Qavatli tashkilot sahifasi: qavatlar, xonalar va jihozlar soni bilan"""
+    return counts_query(
+        Floor.query.filter_by(organization_id=org_id).order_by(Floor.id), Floor.id,
+        room_counts_by(Room.floor_id, Room.organization_id == org_id),
+        equipment_counts_by('floor', db.select(Floor.id).where(Floor.organization_id == org_id))
+    )
+
+def organization_direct_rooms_query(org_id):
+    """Qavatsiz tashkilot sahifasi: xonalar, jihozlar soni bilan"""
+    return counts_query(
+        Room.query.filter_by(organization_id=org_id, floor_id=None).order_by(Room.id), Room.id,
+        equipment_counts_by('room', db.select(Room.id).where(Room.organization_id == org_id, Room.floor_id.is_(None)))
+    )
+
+def floor_rooms_query(floor_id):
+    """Qavat sahifasi: xonalar, jihozlar soni bilan"""
+    return counts_query(
+        Room.query.filter_by(floor_id=floor_id).order_by(Room.id), Room.id,
+        equipment_counts_by('room', db.select(Room.id).where(Room.floor_id == floor_id))
+    )
+
+# HTTP kesh: obyekt versiyalari va kuchli ETag lar (If-None-Match mos kelsa 304)
+def source_version():
+    """app.py va shablonlar xeshi: kod yangilanganda barcha ETag lar eskiradi"""
+    digest = hashlib.sha1()
+    paths = [os.path.abspath(__file__)]
+    for directory, _, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        paths.extend(os.path.join(directory, name) for name in sorted(files))
+    for path in paths:
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+SOURCE_VERSION = source_version()
+
+def etag_for(*parts):
+    """Javob tarkibini belgilovchi qiymatlardan ETag"""
+    return hashlib.sha1(repr((SOURCE_VERSION, parts)).encode()).hexdigest()
+
+def entity_etag(model, entity_id, name=None):
+    """Obyekt ETag i (id, yaratilgan vaqt va versiya - bitta indeksli so'rov); topilmasa None.
+    Yaratilgan vaqt o'chirilgan obyektning id si qayta ishlatilganda ETag takrorlanmasligi uchun."""
+    row = db.session.query(model.created_at, model.version).filter(model.id == entity_id).first()
+    if row is None:
+        return None
+    return etag_for(name or model.__tablename__, entity_id, row.created_at, row.version)
+
+def conditional_response(etag, build):
+    """If-None-Match ETag ga mos kelsa 304 (build chaqirilmaydi: shablon ham, JSON ham yaratilmaydi),
+    aks holda build() javobiga ETag qo'shiladi. etag None bo'lsa (obyekt topilmadi) oddiy javob."""
+    if etag is not None and request.if_none_match.contains(etag):
+        return not_modified(etag)
+    response = app.make_response(build())
+    if etag is not None and response.status_code == 200:
+        response.set_etag(etag)
+        response.cache_control.no_cache = True  # Har safar ETag bilan tekshiriladi
+    return response
+
+def version_bump(model, ids):
+    return db.update(model).where(model.id.in_(ids)).values(version=model.version + 1)
+
+def bump_versions(model, ids):
+    """Obyektlar versiyasini oshirish (ids - ro'yxat yoki subquery), joriy tranzaksiya ichida"""
+    db.session.execute(version_bump(model, ids), execution_options={'synchronize_session': False})
+
+def touch_rooms_statements(room_ids):
+    """Xonalar va ularning qavat/tashkilotlari versiyasini oshiruvchi UPDATE lar"""
+    room_ids = list(set(room_ids))
+    return [
+        version_bump(Room, room_ids),
+        version_bump(Floor, db.select(Room.floor_id).where(Room.id.in_(room_ids))),
+        version_bump(Organization, db.select(Room.organization_id).where(Room.id.in_(room_ids))),
+    ]
+
+def touch_rooms(room_ids):
+    """Xonalar va ularning qavat/tashkilotlari versiyasini oshirish (jihozlari o'zgarganda)"""
+    for statement in touch_rooms_statements(room_ids):
+        db.session.execute(statement, execution_options={'synchronize_session': False})
+
+# Ierarxiya keshi: tashkilot/qavat/xona nomlari va ota id lari (QR matni, eksport, jihoz API si, transfer).
+# Bu maydonlar yaratilgandan keyin o'zgarmaydi, shuning uchun kesh faqat o'chirishda tozalanadi;
+# yangi qo'shilgan obyektlar birinchi murojaatda bazadan yuklanadi (topilmaganlar keshlanmaydi).
+OrganizationNode = namedtuple('OrganizationNode', 'id name has_floors')
+FloorNode = namedtuple('FloorNode', 'id name organization_id')
+RoomNode = namedtuple('RoomNode', 'id name floor_id organization_id')
+RoomPath = namedtuple('RoomPath', 'room_id room_name floor_id floor_name organization_id organization_name')
+
+def hierarchy_rooms_query(room_ids):
+    """Xonalar qavati va tashkiloti bilan (ierarxiya keshiga yuklash uchun)"""
+    return (
+        db.session.query(Room.id, Room.name, Room.floor_id, Room.organization_id,
+                         Floor.name, Organization.name, Organization.has_floors)
+        .outerjoin(Floor, Floor.id == Room.floor_id)
+        .join(Organization, Organization.id == Room.organization_id)
+        .filter(Room.id.in_(room_ids))
+    )
+
+class HierarchyCache:
+    """Jarayon ichidagi LRU kesh ((tur, id) -> tugun), oqimlar uchun xavfsiz.
+    Topilmagan xonalar bitta so'rov bilan qavati va tashkiloti bilan birga yuklanadi."""
+
+    def __init__(self, max_size):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def sync(self, generation):
+        """Bazadagi avlod o'zgargan bo'lsa (boshqa jarayonda o'chirish bo'lgan), keshni tozalash"""
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+
+    def get_many(self, kind, ids):
+        """Keshdagi tugunlar {id: tugun} va keshda yo'q id lar"""
+        found, missing = {}, []
+        with self.lock:
+            for entity_id in ids:
+                node = self.entries.get((kind, entity_id))
+                if node is None:
+                    missing.append(entity_id)
+                else:
+                    self.entries.move_to_end((kind, entity_id))
+                    found[entity_id] = node
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put(self, kind, nodes):
+        with self.lock:
+            for node in nodes:
+                self.entries[(kind, node.id)] = node
+                self.entries.move_to_end((kind, node.id))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def rooms(self, room_ids):
+        found, missing = self.get_many('room', set(room_ids))
+        if missing:
+            rows = hierarchy_rooms_query(missing).all()
+            loaded = [RoomNode(*row[:4]) for row in rows]
+            self.put('organization', {OrganizationNode(row[3], row[5], row[6]) for row in rows})
+            self.put('floor', {FloorNode(row[2], row[4], row[3]) for row in rows if row[2] is not None})
+            self.put('room', loaded)
+            found.update((node.id, node) for node in loaded)
+        return found
+
+    def floors(self, floor_ids):
+        found, missing = self.get_many('floor', set(floor_ids))
+        if missing:
+            loaded = [FloorNode(*row) for row in db.session.query(Floor.id, Floor.name, Floor.organization_id)
+                      .filter(Floor.id.in_(missing))]
+            self.put('floor', loaded)
+            found.update((node.id, node) for node in loaded)
+        return found
+
+    def organizations(self, organization_ids):
+        found, missing = self.get_many('organization', set(organization_ids))
+        if missing:
+            loaded = [OrganizationNode(*row) for row in db.session.query(
+                Organization.id, Organization.name, Organization.has_floors).filter(Organization.id.in_(missing))]
+            self.put('organization', loaded)
+            found.update((node.id, node) for node in loaded)
+        return found
+
+    def room_paths(self, room_ids):
+        """{xona id: RoomPath} - mavjud bo'lmagan xonalar natijaga kirmaydi"""
+        rooms = self.rooms(room_ids)
+        floors = self.floors({room.floor_id for room in rooms.values() if room.floor_id is not None})
+        organizations = self.organizations({room.organization_id for room in rooms.values()})
+        paths = {}
+        for room in rooms.values():
+            floor = floors.get(room.floor_id)
+            organization = organizations.get(room.organization_id)
+            if organization is None:
+                continue
+            paths[room.id] = RoomPath(room.id, room.name, room.floor_id, floor.name if floor else None,
+                                      organization.id, organization.name)
+        return paths
+
+    def room_path(self, room_id):
+        return self.room_paths([room_id]).get(room_id)
+
+    def floor(self, floor_id):
+        return self.floors([floor_id]).get(floor_id)
+
+    def organization(self, organization_id):
+        return self.organizations([organization_id]).get(organization_id)
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'max_size': self.max_size, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+    def render(self):
+        """Prometheus text formati (/metrics ga qo'shiladi)"""
+        stats = self.stats()
+        return '\n'.join([
+            '# HELP inventory_hierarchy_cache_hits_total Ierarxiya keshidan topilgan yozuvlar',
+            '# TYPE inventory_hierarchy_cache_hits_total counter',
+            f"inventory_hierarchy_cache_hits_total {stats['hits']}",
+            '# HELP inventory_hierarchy_cache_misses_total Bazadan yuklangan yozuvlar',
+            '# TYPE inventory_hierarchy_cache_misses_total counter',
+            f"inventory_hierarchy_cache_misses_total {stats['misses']}",
+            '# HELP inventory_hierarchy_cache_evictions_total Hajm chegarasi tufayli chiqarilgan yozuvlar',
+            '# TYPE inventory_hierarchy_cache_evictions_total counter',
+            f"inventory_hierarchy_cache_evictions_total {stats['evictions']}",
+            '# HELP inventory_hierarchy_cache_entries Keshdagi yozuvlar soni',
+            '# TYPE inventory_hierarchy_cache_entries gauge',
+            f"inventory_hierarchy_cache_entries {stats['entries']}",
+        ]) + '\n'
+
+hierarchy_cache = HierarchyCache(app.config['HIERARCHY_CACHE_SIZE'])
+
+def hierarchy():
+    """Ierarxiya keshi; avlod HTTP so'rov boshiga bir marta (so'rovdan tashqarida har safar) tekshiriladi"""
+    if not (has_request_context() and g.get('hierarchy_synced')):
+        hierarchy_cache.sync(db.session.query(HierarchyGeneration.value).filter(HierarchyGeneration.id == 1).scalar())
+        if has_request_context():
+            g.hierarchy_synced = True
+    return hierarchy_cache
+
+@app.teardown_request
+def reset_hierarchy_sync(exception=None):
+    g.pop('hierarchy_synced', None)
+
+def invalidate_hierarchy():
+    """Tashkilot/qavat/xona o'chirilganda (commit dan oldin): avlodni oshirish va shu jarayon keshini tozalash.
+    O'chirilgan obyektning id si SQLite da qayta berilishi mumkin - eski nom qolmasligi kerak."""
+    upsert = sqlite_insert(HierarchyGeneration).values(id=1, value=1)
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=['id'], set_={'value': HierarchyGeneration.value + 1}))
+    hierarchy_cache.clear()
+
+# Bosh sahifa (har bir tashkilot uchun qavat, xona va jihozlar soni bilan)
 @app.route('/')
 def index():
-    organizations = Organization.query.all()
-    return render_template('index.html', organizations=organizations)
+    # Sahifa barcha tashkilotlar versiyalariga bog'liq (sonlar o'zgarsa, tashkilot versiyasi oshadi)
+    etag = etag_for('index', tuple(
+        tuple(row) for row in
+        db.session.query(Organization.id, Organization.created_at, Organization.version).order_by(Organization.id)
+    ))
+    
+    def render():
+        floor_counts = (
+            db.select(Floor.organization_id.label('group_id'), db.func.count(Floor.id).label('floor_count'))
+            .group_by(Floor.organization_id)
+            .subquery()
+        )
+        organizations, counts = with_counts(counts_query(
+            db.session.query(Organization).order_by(Organization.id), Organization.id,
+            floor_counts, room_counts_by(Room.organization_id), equipment_counts_by('organization')
+        ))
+        return render_template('index.html', organizations=organizations, counts=counts)
+    
+    return conditional_response(etag, render)
 
 # Tashkilot qo'shish
 @app.route('/add_organization', methods=['POST'])
@@ -102,13 +837,16 @@ def add_organization():
 # Tashkilot sahifasi
 @app.route('/organization/<int:org_id>')
 def organization_page(org_id):
-    organization = Organization.query.get_or_404(org_id)
-    if organization.has_floors:
-        floors = Floor.query.filter_by(organization_id=org_id).all()
-        return render_template('organization_with_floors.html', organization=organization, floors=floors)
-    else:
-        rooms = Room.query.filter_by(organization_id=org_id, floor_id=None).all()
-        return render_template('organization_direct_rooms.html', organization=organization, rooms=rooms)
+    def render():
+        organization = Organization.query.get_or_404(org_id)
+        if organization.has_floors:
+            floors, counts = with_counts(organization_floors_query(org_id))
+            return render_template('organization_with_floors.html', organization=organization, floors=floors, counts=counts)
+        else:
+            rooms, counts = with_counts(organization_direct_rooms_query(org_id))
+            return render_template('organization_direct_rooms.html', organization=organization, rooms=rooms, counts=counts)
+    
+    return conditional_response(entity_etag(Organization, org_id, 'organization_page'), render)
 
 # Qavat qo'shish
 @app.route('/add_floor', methods=['POST'])
@@ -122,6 +860,7 @@ def add_floor():
     
     floor = Floor(name=name, organization_id=organization_id)
     db.session.add(floor)
+    bump_versions(Organization, [organization_id])
     db.session.commit()
     
     return jsonify({'success': True, 'floor_id': floor.id})
@@ -129,9 +868,12 @@ def add_floor():
 # Qavat sahifasi
 @app.route('/floor/<int:floor_id>')
 def floor_page(floor_id):
-    floor = Floor.query.get_or_404(floor_id)
-    rooms = Room.query.filter_by(floor_id=floor_id).all()
-    return render_template('floor.html', floor=floor, rooms=rooms)
+    def render():
+        floor = Floor.query.options(joinedload(Floor.organization)).filter(Floor.id == floor_id).first_or_404()
+        rooms, counts = with_counts(floor_rooms_query(floor_id))
+        return render_template('floor.html', floor=floor, rooms=rooms, counts=counts)
+    
+    return conditional_response(entity_etag(Floor, floor_id, 'floor_page'), render)
 
 # Xona qo'shish
 @app.route('/add_room', methods=['POST'])
@@ -146,16 +888,132 @@ def add_room():
     
     room = Room(name=name, organization_id=organization_id, floor_id=floor_id)
     db.session.add(room)
+    bump_versions(Organization, [organization_id])
+    if floor_id:
+        bump_versions(Floor, [floor_id])
     db.session.commit()
     
     return jsonify({'success': True, 'room_id': room.id})
 
-# Xona sahifasi
+# Xona sahifasi (jihozlar ro'yxati sahifama-sahifa /room/<id>/equipment orqali yuklanadi)
 @app.route('/room/<int:room_id>')
 def room_page(room_id):
-    room = Room.query.get_or_404(room_id)
-    equipment = Equipment.query.filter_by(room_id=room_id).all()
-    return render_template('room.html', room=room, equipment=equipment)
+    def render():
+        room = Room.query.options(joinedload(Room.organization)).filter(Room.id == room_id).first_or_404()
+        equipment_count = room_equipment_query(room_id).count()
+        return render_template('room.html', room=room, equipment_count=equipment_count)
+    
+    return conditional_response(entity_etag(Room, room_id, 'room_page'), render)
+
+# Xona jihozlari ro'yxatidagi saralash maydonlari
+EQUIPMENT_SORT_FIELDS = {
+    'inv_code': Equipment.inv_code,
+    'name': Equipment.name,
+    'category': Equipment.category,
+    'created_at': Equipment.created_at
+}
+
+def encode_cursor(values):
+    """Keyset sahifalash kursorini yaratish (oxirgi qatorning saralash qiymati va id si)"""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode('utf-8')).decode()
+
+def decode_cursor(cursor, sort):
+    """Kursordan saralash qiymati va id ni olish (noto'g'ri kursor uchun ValueError).
+    Qiymat satr yoki son (created_at uchun ISO sana), id butun son bo'lishi shart -
+    aks holda qiymat so'rovga SQLite qabul qilmaydigan turda uzatilar edi."""
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(decoded, list) or len(decoded) != 2:
+            raise ValueError(cursor)
+        value, last_id = decoded
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError(cursor)
+        if isinstance(last_id, bool) or not isinstance(last_id, int):
+            raise ValueError(cursor)
+        if sort == 'created_at':
+            value = datetime.fromisoformat(value)
+        return value, last_id
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError('Noto\'g\'ri kursor') from e
+
+def like_pattern(text):
+    """LIKE uchun qism-satr shabloni (%, _ belgilari ekranlanadi)"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def room_equipment_query(room_id, search='', category='', status=''):
+    """Xona jihozlari (ixtiyoriy qidiruv, kategoriya va holat filtrlari bilan)"""
+    query = Equipment.query.filter(Equipment.room_id == room_id)
+    if search:
+        pattern = like_pattern(search)
+        query = query.filter(or_(Equipment.name.like(pattern, escape='\\'), Equipment.inv_code.like(pattern, escape='\\')))
+    if category:
+        query = query.filter(Equipment.category == category)
+    if status:
+        query = query.filter(Equipment.status == status)
+    return query
+
+def equipment_page_query(query, sort, descending, after=None):
+    """Keyset sahifalash: (saralash maydoni, id) juftligi bo'yicha - OFFSET ishlatilmaydi.
+    after - oldingi sahifa oxirgi qatorining (qiymat, id) si"""
+    sort_column = EQUIPMENT_SORT_FIELDS[sort]
+    if after:
+        position = db.tuple_(sort_column, Equipment.id)
+        query = query.filter(position < after if descending else position > after)
+    
+    if descending:
+        return query.order_by(sort_column.desc(), Equipment.id.desc())
+    return query.order_by(sort_column, Equipment.id)
+
+# Xona jihozlari: filtrlash, saralash va keyset sahifalash
+@app.route('/room/<int:room_id>/equipment')
+def list_room_equipment(room_id):
+    Room.query.get_or_404(room_id)
+    
+    search = request.args.get('search', '').strip()
+    category = request.args.get('category', '')
+    status = request.args.get('status', '')
+    sort = request.args.get('sort', 'inv_code')
+    descending = request.args.get('order', 'asc') == 'desc'
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    after = request.args.get('after')
+    
+    if sort not in EQUIPMENT_SORT_FIELDS:
+        return jsonify({'error': f'Saralash maydoni noto\'g\'ri: {sort}'}), 400
+    
+    # Filtrlar
+    filtered_query = room_equipment_query(room_id, search, category, status)
+    
+    position = None
+    if after:
+        try:
+            position = decode_cursor(after, sort)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    items = equipment_page_query(filtered_query, sort, descending, position).limit(limit + 1).all()
+    has_more = len(items) > limit
+    items = items[:limit]
+    
+    result = {
+        'items': [{
+            'id': equipment.id,
+            'inv_code': equipment.inv_code,
+            'name': equipment.name,
+            'category': equipment.category,
+            'brand': equipment.brand,
+            'model': equipment.model,
+            'status': equipment.status
+        } for equipment in items],
+        'next_cursor': encode_cursor([getattr(items[-1], sort), items[-1].id]) if has_more else None
+    }
+    
+    # Sonlar faqat birinchi sahifada hisoblanadi
+    if not after:
+        result['total'] = room_equipment_query(room_id).count()
+        result['matched'] = filtered_query.count()
+    
+    return jsonify(result)
 
 # Jihoz qo'shish
 @app.route('/add_equipment', methods=['POST'])
@@ -165,9 +1023,7 @@ def add_equipment():
     # Inventarizatsiya kodi yaratish
     org = Organization.query.get(data['organization_id'])
     room = Room.query.get(data['room_id'])
-    equipment_count = Equipment.query.filter_by(room_id=data['room_id']).count() + 1
-    
-    inv_code = f"{org.name[:3].upper()}-{room.name[:3].upper()}-{equipment_count:04d}"
+    inv_code = allocate_inv_codes(inv_code_prefix(org.name, room.name))[0]
     
     equipment = Equipment(
         inv_code=inv_code,
@@ -179,23 +1035,31 @@ def add_equipment():
         color=data.get('color'),
         status=data.get('status', 'Active'),
         description=data.get('description'),
-        room_id=data['room_id']
+        room_id=room.id,
+        created_at=datetime.utcnow()
     )
     
     db.session.add(equipment)
+    update_inventory_summary({inventory_group(equipment): 1})
+    touch_rooms([room.id])
     db.session.commit()
     
     return jsonify({'success': True, 'equipment_id': equipment.id, 'inv_code': inv_code})
 
-# QR kod yaratish
-@app.route('/generate_qr/<int:equipment_id>')
-def generate_qr(equipment_id):
-    equipment = Equipment.query.get_or_404(equipment_id)
-    
-    # QR kod matni (to'liq ma'lumotlar)
-    qr_text = f"""TASHKILOT: {equipment.room.organization.name}
-QAVAT: {equipment.room.floor.name if equipment.room.floor else 'Yo\'q'}
-XONA: {equipment.room.name}
+QR_CACHE_SUFFIXES = tuple(f'.{fmt}' for fmt in QR_RENDERERS)
+QR_MIMETYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+qr_cache_lock = threading.Lock()
+qr_cache_size = None  # Keshning diskdagi umumiy hajmi (birinchi yozishda hisoblanadi)
+qr_process_pool_lock = threading.Lock()
+qr_process_pool = None
+
+def equipment_qr_text(equipment, path=None):
+    """QR kod matni (to'liq ma'lumotlar); xona, qavat va tashkilot nomlari ierarxiya keshidan"""
+    path = path or hierarchy().room_path(equipment.room_id)
+    return f"""TASHKILOT: {path.organization_name}
+QAVAT: {path.floor_name or "Yo'q"}
+XONA: {path.room_name}
 JIHOZ: {equipment.name}
 KATEGORIYA: {equipment.category}
 INV KODE: {equipment.inv_code}
@@ -205,90 +1069,311 @@ SERIYA: {equipment.serial_number or 'N/A'}
 RANG: {equipment.color or 'N/A'}
 HOLAT: {equipment.status}
 TAVSIF: {equipment.description or 'N/A'}"""
+
+def equipment_qr_texts(equipment_list):
+    """Jihozlar QR matnlari (xonalar yo'llari keshdan bitta murojaat bilan)"""
+    paths = hierarchy().room_paths({equipment.room_id for equipment in equipment_list})
+    return [equipment_qr_text(equipment, paths[equipment.room_id]) for equipment in equipment_list]
+
+def qr_cache_key(qr_text, fmt='png'):
+    """QR rasm kaliti: matn, format va chizish parametrlari xeshi (ETag sifatida ham ishlatiladi)"""
+    return hashlib.sha256(f"{fmt}\n{sorted(QR_RENDER_PARAMS.items())}\n{qr_text}".encode('utf-8')).hexdigest()
+
+def qr_cache_path(qr_text, fmt='png'):
+    """QR kesh fayli yo'li"""
+    return os.path.join(app.config['QR_CACHE_DIR'], f"{qr_cache_key(qr_text, fmt)}.{fmt}")
+
+def qr_cache_entries():
+    """Keshdagi QR rasm fayllari"""
+    return [entry for entry in os.scandir(app.config['QR_CACHE_DIR']) if entry.name.endswith(QR_CACHE_SUFFIXES)]
+
+def evict_qr_cache(max_bytes):
+    """Eng uzoq ishlatilmagan QR fayllarni o'chirib, kesh hajmini chegaradan pastga tushirish
+
+    Natija: keshning yangi umumiy hajmi
+    """
+    entries = qr_cache_entries()
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    total = sum(entry.stat().st_size for entry in entries)
+    
+    # Har yozishda tozalamaslik uchun chegaraning 90% igacha bo'shatiladi
+    for entry in entries:
+        if total <= max_bytes * 0.9:
+            break
+        try:
+            os.remove(entry.path)
+            total -= entry.stat().st_size
+        except FileNotFoundError:
+            pass
+    
+    return total
+
+def read_qr_cache(qr_text, fmt='png'):
+    """QR kod rasmini keshdan o'qish (topilmasa None)"""
+    path = qr_cache_path(qr_text, fmt)
     
-    # QR kod yaratish (40x30mm qog'oz uchun optimallashtirilgan)
-    qr = qrcode.QRCode(
-        version=3,           # Kattaroq versiya (ko'p ma'lumot uchun)
-        box_size=2,          # Kichikroq box_size (ko'p ma'lumot uchun)
-        border=1             # Minimal border
-    )
-    qr.add_data(qr_text)
-    qr.make(fit=True)
+    try:
+        with open(path, 'rb') as cached:
+            image = cached.read()
+        os.utime(path)  # LRU uchun oxirgi foydalanish vaqti
+        return image
+    except FileNotFoundError:
+        return None
+
+def write_qr_cache(qr_text, image, fmt='png'):
+    """QR kod rasmini keshga yozish va kerak bo'lsa eski fayllarni tozalash"""
+    global qr_cache_size
+    
+    # Vaqtinchalik faylga yozib, keyin atomar almashtirish (parallel so'rovlar uchun)
+    os.makedirs(app.config['QR_CACHE_DIR'], exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=app.config['QR_CACHE_DIR'], suffix='.tmp')
+    with os.fdopen(fd, 'wb') as output:
+        output.write(image)
+    os.replace(tmp_path, qr_cache_path(qr_text, fmt))
+    
+    with qr_cache_lock:
+        if qr_cache_size is None:
+            qr_cache_size = sum(entry.stat().st_size for entry in qr_cache_entries())
+        else:
+            qr_cache_size += len(image)
+        
+        if qr_cache_size > app.config['QR_CACHE_MAX_BYTES']:
+            qr_cache_size = evict_qr_cache(app.config['QR_CACHE_MAX_BYTES'])
+
+def get_qr_image(qr_text, fmt='png'):
+    """QR kod rasmini keshdan olish, topilmasa yaratib keshga yozish"""
+    image = read_qr_cache(qr_text, fmt)
     
-    img = qr.make_image(fill_color="black", back_color="white")
+    if image is None:
+        image = QR_RENDERERS[fmt](qr_text)
+        write_qr_cache(qr_text, image, fmt)
     
-    # Rasmni base64 formatiga o'tkazish
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
+    return image
+
+def get_qr_process_pool():
+    """QR chizish uchun jarayonlar pool i (birinchi ommaviy so'rovda yaratiladi)"""
+    global qr_process_pool
+    with qr_process_pool_lock:
+        if qr_process_pool is None:
+            qr_process_pool = ProcessPoolExecutor(
+                max_workers=app.config['QR_WORKERS'],
+                mp_context=multiprocessing.get_context(app.config['QR_START_METHOD'])
+            )
+    return qr_process_pool
+
+def get_qr_pngs(qr_texts):
+    """Bir nechta QR kod PNG larini kiritilgan tartibda olish
+
+    Keshda yo'q rasmlar CPU yadrolari bo'yicha jarayonlar pool ida parallel
+    chiziladi (QR mask tanlash va PNG kodlash CPU ga bog'liq ish).
+    """
+    pngs = [read_qr_cache(qr_text) for qr_text in qr_texts]
+    missing = [index for index, png in enumerate(pngs) if png is None]
+    missing_texts = [qr_texts[index] for index in missing]
+    
+    if len(missing) >= app.config['QR_PARALLEL_MIN_BATCH'] and app.config['QR_WORKERS'] > 1:
+        chunksize = max(1, len(missing) // (app.config['QR_WORKERS'] * 4))
+        rendered = get_qr_process_pool().map(render_qr_png, missing_texts, chunksize=chunksize)
+    else:
+        rendered = map(render_qr_png, missing_texts)
     
-    img_base64 = base64.b64encode(buffer.getvalue()).decode()
+    for index, qr_text, png in zip(missing, missing_texts, rendered):
+        write_qr_cache(qr_text, png)
+        pngs[index] = png
     
-    return jsonify({'qr_code': img_base64, 'inv_code': equipment.inv_code})
+    return pngs
 
-# Xonadagi barcha jihozlar uchun QR kodlar yaratish
-@app.route('/generate_room_qr_codes/<int:room_id>')
-def generate_room_qr_codes(room_id):
-    room = Room.query.get_or_404(room_id)
-    equipment_list = Equipment.query.filter_by(room_id=room_id).all()
-    
+def invalidate_qr_cache(qr_text):
+    """Eskirgan QR kod rasmlarini (barcha formatlarda) keshdan o'chirish"""
+    global qr_cache_size
+    
+    for fmt in QR_RENDERERS:
+        path = qr_cache_path(qr_text, fmt)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        
+        with qr_cache_lock:
+            if qr_cache_size is not None:
+                qr_cache_size -= size
+
+def not_modified(etag):
+    """304 Not Modified javobi (tana yaratilmaydi)"""
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+def qr_codes_response(equipment_list, **extra):
+    """Jihozlar ro'yxati uchun QR kodlar JSON javobi (jihozlar tartibi saqlanadi)
+
+    ?inline=0 bo'lsa, base64 rasm o'rniga har bir jihozning /qr/<id>.png manzili
+    qaytariladi (rasmlar baribir keshga oldindan chizib qo'yiladi).
+    """
     if not equipment_list:
-        return jsonify({'success': False, 'message': 'Xonada jihoz yo\'q'})
+        return jsonify({'success': False, 'message': 'Jihozlar topilmadi'})
     
-    qr_codes = []
+    inline = request.args.get('inline', '1') != '0'
+    paths = hierarchy().room_paths({equipment.room_id for equipment in equipment_list})
+    pngs = get_qr_pngs([equipment_qr_text(equipment, paths[equipment.room_id]) for equipment in equipment_list])
     
-    for equipment in equipment_list:
-        # QR kod matni (to'liq ma'lumotlar)
-        qr_text = f"""TASHKILOT: {equipment.room.organization.name}
-QAVAT: {equipment.room.floor.name if equipment.room.floor else 'Yo\'q'}
-XONA: {equipment.room.name}
-JIHOZ: {equipment.name}
-KATEGORIYA: {equipment.category}
-INV KODE: {equipment.inv_code}
-BREND: {equipment.brand or 'N/A'}
-MODEL: {equipment.model or 'N/A'}
-SERIYA: {equipment.serial_number or 'N/A'}
-RANG: {equipment.color or 'N/A'}
-HOLAT: {equipment.status}
-TAVSIF: {equipment.description or 'N/A'}"""
-        
-        # QR kod yaratish (40x30mm qog'oz uchun optimallashtirilgan)
-        qr = qrcode.QRCode(
-            version=3,           # Kattaroq versiya (ko'p ma'lumot uchun)
-            box_size=2,          # Kichikroq box_size (ko'p ma'lumot uchun)
-            border=1             # Minimal border
-        )
-        qr.add_data(qr_text)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Rasmni base64 formatiga o'tkazish
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
-        qr_codes.append({
+    qr_codes = []
+    for equipment, png in zip(equipment_list, pngs):
+        qr_code = {
             'equipment_id': equipment.id,
             'inv_code': equipment.inv_code,
             'name': equipment.name,
-            'qr_code': img_base64
-        })
+            'room_name': paths[equipment.room_id].room_name
+        }
+        if inline:
+            qr_code['qr_code'] = base64.b64encode(png).decode()  # Rasmni base64 formatiga o'tkazish
+        else:
+            qr_code['qr_url'] = f'/qr/{equipment.id}.png'
+        qr_codes.append(qr_code)
     
     return jsonify({
         'success': True,
-        'room_name': room.name,
+        **extra,
         'equipment_count': len(qr_codes),
         'qr_codes': qr_codes
     })
 
-# Jihoz ma'lumotlarini olish
-@app.route('/equipment/<int:equipment_id>')
-def get_equipment(equipment_id):
+def qr_zip_response(equipment_list, download_name):
+    """Jihozlar QR kodlarini bitta ZIP arxiv sifatida yuborish (tartib fayl nomida saqlanadi)"""
+    if not equipment_list:
+        return jsonify({'success': False, 'message': 'Jihozlar topilmadi'}), 404
+    
+    qr_texts = equipment_qr_texts(equipment_list)
+    etag = hashlib.sha256(''.join(qr_cache_key(qr_text) for qr_text in qr_texts).encode('utf-8')).hexdigest()
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+    
+    pngs = get_qr_pngs(qr_texts)
+    
+    # PNG allaqachon siqilgan - arxivda qayta siqilmaydi
+    output = tempfile.TemporaryFile()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for index, (equipment, png) in enumerate(zip(equipment_list, pngs), 1):
+            safe_code = re.sub(r'[^\w.-]', '_', equipment.inv_code)
+            archive.writestr(f"{index:04d}_{safe_code}.png", png)
+    output.seek(0)
+    
+    response = send_file(output, as_attachment=True, download_name=download_name, mimetype='application/zip')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+def qr_equipment_query():
+    """QR matni va jihoz ma'lumotlari uchun jihozlar so'rovi (xona, qavat va tashkilot nomlari
+    join qilinmaydi - ular ierarxiya keshidan olinadi)"""
+    return Equipment.query
+
+def room_qr_query(room_id):
+    """Xonadagi jihozlar (QR uchun, barqaror tartibda)"""
+    return qr_equipment_query().filter(Equipment.room_id == room_id).order_by(Equipment.id)
+
+def floor_qr_query(floor_id):
+    """Qavatdagi jihozlar (QR uchun, barqaror tartibda)"""
+    return (
+        qr_equipment_query()
+        .join(Room, Equipment.room_id == Room.id)
+        .filter(Room.floor_id == floor_id)
+        .order_by(Room.id, Equipment.id)
+    )
+
+def organization_qr_query(org_id):
+    """Tashkilotdagi jihozlar (QR uchun, barqaror tartibda)"""
+    return (
+        qr_equipment_query()
+        .join(Room, Equipment.room_id == Room.id)
+        .filter(Room.organization_id == org_id)
+        .order_by(Room.floor_id, Room.id, Equipment.id)
+    )
+
+def room_qr_equipment(room_id):
+    return room_qr_query(room_id).all()
+
+def floor_qr_equipment(floor_id):
+    return floor_qr_query(floor_id).all()
+
+def organization_qr_equipment(org_id):
+    return organization_qr_query(org_id).all()
+
+# QR kod yaratish
+@app.route('/generate_qr/<int:equipment_id>')
+def generate_qr(equipment_id):
     equipment = Equipment.query.get_or_404(equipment_id)
-    return jsonify({
+    
+    # QR kod rasmi (keshdan yoki yangi yaratilgan)
+    png = get_qr_image(equipment_qr_text(equipment))
+    
+    # Rasmni base64 formatiga o'tkazish
+    img_base64 = base64.b64encode(png).decode()
+    
+    return jsonify({'qr_code': img_base64, 'inv_code': equipment.inv_code})
+
+# QR kod rasmi (PNG yoki SVG) - brauzer keshlashi uchun ETag bilan
+@app.route('/qr/<int:equipment_id>.<any(png, svg):fmt>')
+def qr_image(equipment_id, fmt):
+    equipment = Equipment.query.get_or_404(equipment_id)
+    qr_text = equipment_qr_text(equipment)
+    
+    # Kontent xeshi o'zgarmagan bo'lsa, rasm umuman o'qilmaydi
+    etag = qr_cache_key(qr_text, fmt)
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+    
+    response = app.response_class(get_qr_image(qr_text, fmt), mimetype=QR_MIMETYPES[fmt])
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # Har safar ETag bilan tekshiriladi
+    return response
+
+# Xonadagi barcha jihozlar uchun QR kodlar yaratish
+@app.route('/generate_room_qr_codes/<int:room_id>')
+def generate_room_qr_codes(room_id):
+    room = Room.query.get_or_404(room_id)
+    equipment_list = room_qr_equipment(room_id)
+    
+    if not equipment_list:
+        return jsonify({'success': False, 'message': 'Xonada jihoz yo\'q'})
+    
+    return qr_codes_response(equipment_list, room_name=room.name)
+
+# Qavatdagi barcha jihozlar uchun QR kodlar yaratish
+@app.route('/generate_floor_qr_codes/<int:floor_id>')
+def generate_floor_qr_codes(floor_id):
+    floor = Floor.query.get_or_404(floor_id)
+    return qr_codes_response(floor_qr_equipment(floor_id), floor_name=floor.name)
+
+# Tashkilotdagi barcha jihozlar uchun QR kodlar yaratish
+@app.route('/generate_organization_qr_codes/<int:org_id>')
+def generate_organization_qr_codes(org_id):
+    organization = Organization.query.get_or_404(org_id)
+    return qr_codes_response(organization_qr_equipment(org_id), organization_name=organization.name)
+
+# Xona QR kodlarini ZIP arxiv sifatida yuklab olish
+@app.route('/qr/room/<int:room_id>.zip')
+def room_qr_zip(room_id):
+    room = Room.query.get_or_404(room_id)
+    return qr_zip_response(room_qr_equipment(room_id), f"{room.name}_qr_kodlar.zip")
+
+# Qavat QR kodlarini ZIP arxiv sifatida yuklab olish
+@app.route('/qr/floor/<int:floor_id>.zip')
+def floor_qr_zip(floor_id):
+    floor = Floor.query.get_or_404(floor_id)
+    return qr_zip_response(floor_qr_equipment(floor_id), f"{floor.name}_qr_kodlar.zip")
+
+# Tashkilot QR kodlarini ZIP arxiv sifatida yuklab olish
+@app.route('/qr/organization/<int:org_id>.zip')
+def organization_qr_zip(org_id):
+    organization = Organization.query.get_or_404(org_id)
+    return qr_zip_response(organization_qr_equipment(org_id), f"{organization.name}_qr_kodlar.zip")
+
+def equipment_to_dict(equipment, path=None):
+    """Jihoz ma'lumotlari (xona, qavat va tashkilot nomlari ierarxiya keshidan)"""
+    path = path or hierarchy().room_path(equipment.room_id)
+    return {
         'id': equipment.id,
         'inv_code': equipment.inv_code,
         'name': equipment.name,
@@ -299,9 +1384,96 @@ def get_equipment(equipment_id):
         'color': equipment.color,
         'status': equipment.status,
         'description': equipment.description,
-        'room_name': equipment.room.name,
-        'floor_name': equipment.room.floor.name if equipment.room.floor else None,
-        'organization_name': equipment.room.organization.name
+        'room_name': path.room_name,
+        'floor_name': path.floor_name,
+        'organization_name': path.organization_name
+    }
+
+# Jihoz ma'lumotlarini olish
+@app.route('/equipment/<int:equipment_id>')
+def get_equipment(equipment_id):
+    def build():
+        equipment = qr_equipment_query().filter(Equipment.id == equipment_id).first_or_404()
+        return jsonify(equipment_to_dict(equipment))
+    
+    return conditional_response(entity_etag(Equipment, equipment_id), build)
+
+LOOKUP_BATCH_LIMIT = 500
+QR_INV_CODE_PATTERN = re.compile(r'^INV KODE:\s*(.+?)\s*$', re.MULTILINE)
+
+def scanned_code(value):
+    """Skanerdan kelgan qiymat: inventar kodi, seriya raqami yoki to'liq QR matni"""
+    value = (value or '').strip()
+    match = QR_INV_CODE_PATTERN.search(value)
+    return match.group(1) if match else value
+
+def inv_code_lookup_query(codes):
+    return qr_equipment_query().filter(Equipment.inv_code.in_(codes))
+
+def serial_number_lookup_query(codes):
+    """Seriya raqami bo'yicha: id lar faqat ix_equipment_serial_number indeksidan o'qiladi
+    (rowid har bir SQLite indeksida bor), qatorlar esa keyin id bo'yicha olinadi"""
+    ids = db.select(Equipment.id).where(Equipment.serial_number.in_(codes))
+    return qr_equipment_query().filter(Equipment.id.in_(ids)).order_by(Equipment.id)
+
+def lookup_equipment(codes):
+    """Kodlarni jihozlarga moslash: avval inv_code, topilmaganlari seriya raqami bo'yicha.
+    Natija: {kod: [jihozlar]} (seriya raqami bir nechta jihozda takrorlanishi mumkin)"""
+    found = {}
+    for equipment in inv_code_lookup_query(codes):
+        found[equipment.inv_code] = [equipment]
+    
+    remaining = [code for code in codes if code not in found]
+    if remaining:
+        for equipment in serial_number_lookup_query(remaining):
+            found.setdefault(equipment.serial_number, []).append(equipment)
+    return found
+
+# Inventar kodi yoki seriya raqami bo'yicha jihozni topish (QR skaner uchun)
+@app.route('/lookup')
+def lookup():
+    code = scanned_code(request.args.get('code'))
+    if not code:
+        return jsonify({'error': 'Kod (code) kiritilishi shart'}), 400
+    
+    matches = lookup_equipment([code]).get(code, [])
+    if not matches:
+        return jsonify({'error': f'Jihoz topilmadi: {code}'}), 404
+    if len(matches) > 1:
+        return jsonify({
+            'error': f'Bu seriya raqami bir nechta jihozda mavjud: {code}',
+            'matches': [equipment_to_dict(equipment) for equipment in matches]
+        }), 409
+    return jsonify(equipment_to_dict(matches[0]))
+
+# Bir nechta skanerlangan kodlarni bitta so'rovda topish
+@app.route('/lookup', methods=['POST'])
+def lookup_batch():
+    data = request.get_json(silent=True) or {}
+    codes = data.get('codes')
+    if not isinstance(codes, list) or not codes:
+        return jsonify({'error': 'Kodlar ro\'yxati (codes) kiritilishi shart'}), 400
+    if len(codes) > LOOKUP_BATCH_LIMIT:
+        return jsonify({'error': f'Bir so\'rovda {LOOKUP_BATCH_LIMIT} tadan ko\'p kod yuborib bo\'lmaydi'}), 400
+    
+    codes = [scanned_code(str(code)) for code in codes]
+    found = lookup_equipment(list({code for code in codes if code}))
+    paths = hierarchy().room_paths({equipment.room_id for matches in found.values() for equipment in matches})
+    
+    # Natijalar yuborilgan tartibda
+    results = []
+    for code in codes:
+        matches = found.get(code, [])
+        results.append({
+            'code': code,
+            'found': bool(matches),
+            'equipment': [equipment_to_dict(equipment, paths[equipment.room_id]) for equipment in matches]
+        })
+    
+    return jsonify({
+        'results': results,
+        'found': sum(1 for result in results if result['found']),
+        'not_found': [result['code'] for result in results if not result['found']]
     })
 
 # Jihoz ma'lumotlarini yangilash
@@ -309,6 +1481,8 @@ def get_equipment(equipment_id):
 def update_equipment(equipment_id):
     equipment = Equipment.query.get_or_404(equipment_id)
     data = request.get_json()
+    old_qr_text = equipment_qr_text(equipment)
+    old_group = inventory_group(equipment)
     
     # Ma'lumotlarni yangilash
     equipment.name = data.get('name', equipment.name)
@@ -320,36 +1494,104 @@ def update_equipment(equipment_id):
     equipment.status = data.get('status', equipment.status)
     equipment.description = data.get('description', equipment.description)
     
+    new_group = inventory_group(equipment)
+    if new_group != old_group:
+        update_inventory_summary(Counter({old_group: -1, new_group: 1}))
+    equipment.version += 1
     db.session.commit()
     
+    # QR kodga kiradigan maydonlar o'zgargan bo'lsa, eski rasmni keshdan o'chirish
+    if equipment_qr_text(equipment) != old_qr_text:
+        invalidate_qr_cache(old_qr_text)
+    
     return jsonify({'success': True, 'message': 'Jihoz ma\'lumotlari yangilandi'})
 
+def equipment_transfers_deletion(equipment_id):
+    """Jihoz transfer tarixi: (yozuvlar sharti, DELETE)"""
+    transfers = TransferHistory.equipment_id == equipment_id
+    return transfers, db.delete(TransferHistory).where(transfers)
+
 # Jihozni o'chirish
 @app.route('/delete_equipment/<int:equipment_id>', methods=['DELETE'])
 def delete_equipment(equipment_id):
     equipment = Equipment.query.get_or_404(equipment_id)
+    qr_text = equipment_qr_text(equipment)
+    transfers, delete_transfers = equipment_transfers_deletion(equipment_id)
+    update_inventory_summary({inventory_group(equipment): -1})
+    remove_transfers_from_breakdown(transfers)
+    touch_rooms([equipment.room_id])
+    db.session.execute(delete_transfers, execution_options={'synchronize_session': False})
     db.session.delete(equipment)
     db.session.commit()
     
+    invalidate_qr_cache(qr_text)
+    
     return jsonify({'success': True, 'message': 'Jihoz o\'chirildi'})
 
+def delete_rooms_where(*criteria):
+    """Shartga mos xonalarni jihozlari va transfer tarixi bilan birga o'chirish
+
+    ORM cascade o'rniga bir nechta to'plamli DELETE ... WHERE ... IN (subquery):
+    obyektlar xotiraga yuklanmaydi, o'chirish joriy tranzaksiya ichida bajariladi
+    (commit chaqiruvchi tomonidan).
+    """
+    room_ids, transfers, statements = rooms_deletion(*criteria)
+    remove_rooms_from_summary(room_ids)
+    remove_transfers_from_breakdown(transfers)
+    # Identity map ni sinxronlash shart emas - o'chirilgan obyektlar sessiyada ishlatilmaydi
+    for statement in statements:
+        db.session.execute(statement, execution_options={'synchronize_session': False})
+
+def rooms_deletion(*criteria):
+    """Shartga mos xonalar: (id lar subquery si, transfer yozuvlari sharti, UPDATE/DELETE lar tartib bilan)"""
+    room_ids = db.select(Room.id).where(*criteria)
+    equipment_ids = db.select(Equipment.id).where(Equipment.room_id.in_(room_ids))
+    transfers = or_(
+        TransferHistory.equipment_id.in_(equipment_ids),
+        TransferHistory.from_room_id.in_(room_ids),
+        TransferHistory.to_room_id.in_(room_ids)
+    )
+    return room_ids, transfers, [
+        # Boshqa xonalardagi jihozlarning transfer tarixi ham o'zgaradi
+        version_bump(Equipment, db.select(TransferHistory.equipment_id).where(transfers)),
+        version_bump(Floor, db.select(Room.floor_id).where(*criteria)),
+        version_bump(Organization, db.select(Room.organization_id).where(*criteria)),
+        db.delete(TransferHistory).where(transfers),
+        db.delete(Equipment).where(Equipment.room_id.in_(room_ids)),
+        db.delete(Room).where(*criteria),
+    ]
+
+def organization_deletion(org_id):
+    """Xonalari o'chirilgandan keyin: tashkilot va qavatlarining yig'ma yozuvlari, qavatlar va tashkilot"""
+    return [
+        db.delete(InventorySummary).where(or_(
+            (InventorySummary.scope == 'organization') & (InventorySummary.scope_id == org_id),
+            (InventorySummary.scope == 'floor') & InventorySummary.scope_id.in_(db.select(Floor.id).where(Floor.organization_id == org_id))
+        )),
+        db.delete(InventoryBreakdown).where(
+            InventoryBreakdown.dimension.in_(BREAKDOWN_DIMENSIONS), InventoryBreakdown.organization_id == org_id
+        ),
+        db.delete(Floor).where(Floor.organization_id == org_id),
+        db.delete(Organization).where(Organization.id == org_id),
+    ]
+
+def floor_deletion(floor_id):
+    """Xonalari o'chirilgandan keyin: qavat yig'ma yozuvlari va qavat"""
+    return [
+        db.delete(InventorySummary).where(InventorySummary.scope == 'floor', InventorySummary.scope_id == floor_id),
+        db.delete(Floor).where(Floor.id == floor_id),
+    ]
+
 # Tashkilotni o'chirish
 @app.route('/delete_organization/<int:org_id>', methods=['DELETE'])
 def delete_organization(org_id):
-    organization = Organization.query.get_or_404(org_id)
+    Organization.query.get_or_404(org_id)
     
-    # Tashkilotdagi barcha xonalarni olish
-    rooms = Room.query.filter_by(organization_id=org_id).all()
-    
-    # Har bir xona uchun transfer_history ni o'chirish
-    for room in rooms:
-        TransferHistory.query.filter(
-            (TransferHistory.from_room_id == room.id) | 
-            (TransferHistory.to_room_id == room.id)
-        ).delete()
-    
-    # Keyin tashkilotni o'chirish (qavatlar va xonlar cascade orqali o'chiriladi)
-    db.session.delete(organization)
+    # Xonalar (qavatdagilari ham), qavatlar va tashkilot
+    delete_rooms_where(Room.organization_id == org_id)
+    for statement in organization_deletion(org_id):
+        db.session.execute(statement, execution_options={'synchronize_session': False})
+    invalidate_hierarchy()
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Tashkilot o\'chirildi'})
@@ -359,18 +1601,11 @@ def delete_organization(org_id):
 def delete_floor(floor_id):
     floor = Floor.query.get_or_404(floor_id)
     
-    # Qavatdagi barcha xonalarni olish
-    rooms = Room.query.filter_by(floor_id=floor_id).all()
-    
-    # Har bir xona uchun transfer_history ni o'chirish
-    for room in rooms:
-        TransferHistory.query.filter(
-            (TransferHistory.from_room_id == room.id) | 
-            (TransferHistory.to_room_id == room.id)
-        ).delete()
-    
-    # Keyin qavatni o'chirish (xonlar cascade orqali o'chiriladi)
-    db.session.delete(floor)
+    bump_versions(Organization, [floor.organization_id])
+    delete_rooms_where(Room.floor_id == floor_id)
+    for statement in floor_deletion(floor_id):
+        db.session.execute(statement, execution_options={'synchronize_session': False})
+    invalidate_hierarchy()
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Qavat o\'chirildi'})
@@ -379,7 +1614,7 @@ def delete_floor(floor_id):
 @app.route('/check_room_equipment/<int:room_id>')
 def check_room_equipment(room_id):
     room = Room.query.get_or_404(room_id)
-    equipment_count = Equipment.query.filter_by(room_id=room_id).count()
+    equipment_count = room_equipment_query(room_id).count()
     
     return jsonify({
         'has_equipment': equipment_count > 0,
@@ -390,16 +1625,11 @@ def check_room_equipment(room_id):
 # Xonani o'chirish (jihozlar bilan birga)
 @app.route('/delete_room_with_equipment/<int:room_id>', methods=['DELETE'])
 def delete_room_with_equipment(room_id):
-    room = Room.query.get_or_404(room_id)
-    
-    # Avval transfer_history jadvalidagi ma'lumotlarni o'chirish
-    TransferHistory.query.filter(
-        (TransferHistory.from_room_id == room_id) | 
-        (TransferHistory.to_room_id == room_id)
-    ).delete()
+    Room.query.get_or_404(room_id)
     
-    # Keyin xonani o'chirish (jihozlar cascade orqali o'chiriladi)
-    db.session.delete(room)
+    # Transfer tarixi, jihozlar va xona to'plamli DELETE lar bilan
+    delete_rooms_where(Room.id == room_id)
+    invalidate_hierarchy()
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Xona va barcha jihozlar o\'chirildi'})
@@ -407,10 +1637,10 @@ def delete_room_with_equipment(room_id):
 # Xonani o'chirish (jihozlarsiz)
 @app.route('/delete_room/<int:room_id>', methods=['DELETE'])
 def delete_room(room_id):
-    room = Room.query.get_or_404(room_id)
+    Room.query.get_or_404(room_id)
     
     # Jihozlar mavjudligini tekshirish
-    equipment_count = Equipment.query.filter_by(room_id=room_id).count()
+    equipment_count = room_equipment_query(room_id).count()
     
     if equipment_count > 0:
         return jsonify({
@@ -420,14 +1650,9 @@ def delete_room(room_id):
             'message': f'Xonada {equipment_count} ta jihoz mavjud. Avval jihozlarni boshqa joyga ko\'chiring yoki o\'chiring.'
         })
     
-    # Avval transfer_history jadvalidagi ma'lumotlarni o'chirish
-    TransferHistory.query.filter(
-        (TransferHistory.from_room_id == room_id) | 
-        (TransferHistory.to_room_id == room_id)
-    ).delete()
-    
-    # Keyin xonani o'chirish
-    db.session.delete(room)
+    # Transfer tarixi va xona (jihozlar yo'q) - delete_room_with_equipment bilan bir xil so'rovlar
+    delete_rooms_where(Room.id == room_id)
+    invalidate_hierarchy()
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Xona o\'chirildi'})
@@ -453,18 +1678,18 @@ def transfer_equipment(equipment_id):
     if equipment.room_id == new_room_id:
         return jsonify({'success': False, 'message': 'Jihoz allaqachon bu xonada'})
     
-    # Eski ma'lumotlarni saqlash
+    # Eski ma'lumotlarni saqlash (xonalar nomlari ierarxiya keshidan)
+    paths = hierarchy().room_paths([equipment.room_id, new_room.id])
     old_room_id = equipment.room_id
-    old_room_name = equipment.room.name
+    old_room_name = paths[old_room_id].room_name
     old_inv_code = equipment.inv_code
+    old_qr_text = equipment_qr_text(equipment, paths[old_room_id])
     
     # Jihozni yangi xonaga ko'chirish
     equipment.room_id = new_room_id
     
     # Inventarizatsiya kodini yangilash
-    org = equipment.room.organization
-    equipment_count = Equipment.query.filter_by(room_id=new_room_id).count()
-    new_inv_code = f"{org.name[:3].upper()}-{new_room.name[:3].upper()}-{equipment_count:04d}"
+    new_inv_code = allocate_inv_codes(inv_code_prefix(paths[new_room.id].organization_name, new_room.name))[0]
     equipment.inv_code = new_inv_code
     
     # Transfer tarixini saqlash
@@ -474,68 +1699,435 @@ def transfer_equipment(equipment_id):
         to_room_id=new_room_id,
         old_inv_code=old_inv_code,
         new_inv_code=new_inv_code,
+        transfer_date=datetime.utcnow(),
         notes=notes
     )
     
     db.session.add(transfer_record)
+    update_inventory_summary({
+        inventory_group(equipment, old_room_id): -1,
+        inventory_group(equipment, new_room.id): 1
+    })
+    equipment.version += 1
+    touch_rooms([old_room_id, new_room.id])
+    apply_breakdown_deltas({('transfer_month', new_room.organization_id, created_month(transfer_record.transfer_date)): 1})
     db.session.commit()
     
+    # Xona va inventarizatsiya kodi o'zgardi - eski QR rasm endi kerak emas
+    invalidate_qr_cache(old_qr_text)
+    
     return jsonify({
         'success': True, 
         'message': f'Jihoz "{old_room_name}" dan "{new_room.name}" ga ko\'chirildi',
         'new_inv_code': new_inv_code
     })
 
+BULK_TRANSFER_LIMIT = 1000
+
+# Bir nechta jihozni bitta xonaga ko'chirish (bitta tranzaksiya)
+@app.route('/transfer_equipment/bulk', methods=['POST'])
+def bulk_transfer_equipment():
+    data = request.get_json(silent=True) or {}
+    equipment_ids = data.get('equipment_ids')
+    new_room_id = data.get('room_id')
+    notes = data.get('notes', '')
+    
+    if equipment_ids is not None and not (
+        isinstance(equipment_ids, list)
+        and all(isinstance(equipment_id, int) and not isinstance(equipment_id, bool) for equipment_id in equipment_ids)
+    ):
+        return jsonify({'success': False, 'message': 'equipment_ids butun sonlar ro\'yxati bo\'lishi kerak'}), 400
+    if not equipment_ids:
+        return jsonify({'success': False, 'message': 'Jihozlar tanlanmagan'})
+    if len(equipment_ids) > BULK_TRANSFER_LIMIT:
+        return jsonify({'success': False, 'message': f'Bir vaqtda {BULK_TRANSFER_LIMIT} tadan ko\'p jihozni ko\'chirib bo\'lmaydi'})
+    if not new_room_id:
+        return jsonify({'success': False, 'message': 'Yangi xona tanlanmagan'})
+    
+    new_room = Room.query.get(new_room_id)
+    if not new_room:
+        return jsonify({'success': False, 'message': 'Xona topilmadi'})
+    
+    # Barcha jihozlarni bitta so'rov bilan tekshirish
+    equipment_ids = list(dict.fromkeys(equipment_ids))
+    found = {equipment.id: equipment for equipment in qr_equipment_query().filter(Equipment.id.in_(equipment_ids))}
+    
+    missing = [equipment_id for equipment_id in equipment_ids if equipment_id not in found]
+    if missing:
+        return jsonify({'success': False, 'message': f'Jihozlar topilmadi: {", ".join(map(str, missing))}', 'missing': missing})
+    
+    already_there = [equipment_id for equipment_id in equipment_ids if found[equipment_id].room_id == new_room.id]
+    if already_there:
+        return jsonify({
+            'success': False,
+            'message': f'Jihozlar allaqachon bu xonada: {", ".join(found[i].inv_code for i in already_there)}',
+            'already_in_room': already_there
+        })
+    
+    items = [found[equipment_id] for equipment_id in equipment_ids]
+    old_qr_texts = equipment_qr_texts(items)
+    
+    # Yangi kodlar bitta blok bilan
+    organization = hierarchy().organization(new_room.organization_id)
+    new_codes = allocate_inv_codes(inv_code_prefix(organization.name, new_room.name), len(items))
+    transfer_date = datetime.utcnow()
+    
+    # Jihozlarni yangilash va transfer tarixini yozish - ikkita executemany
+    equipment_table = Equipment.__table__
+    db.session.execute(
+        equipment_table.update()
+        .where(equipment_table.c.id == bindparam('equipment_id'))
+        .values(room_id=new_room.id, inv_code=bindparam('new_inv_code'), version=equipment_table.c.version + 1),
+        [{'equipment_id': equipment.id, 'new_inv_code': code} for equipment, code in zip(items, new_codes)]
+    )
+    db.session.execute(TransferHistory.__table__.insert(), [{
+        'equipment_id': equipment.id,
+        'from_room_id': equipment.room_id,
+        'to_room_id': new_room.id,
+        'old_inv_code': equipment.inv_code,
+        'new_inv_code': code,
+        'transfer_date': transfer_date,
+        'notes': notes
+    } for equipment, code in zip(items, new_codes)])
+    
+    summary_changes = Counter()
+    for equipment in items:
+        summary_changes[inventory_group(equipment)] -= 1
+        summary_changes[inventory_group(equipment, new_room.id)] += 1
+    update_inventory_summary(summary_changes)
+    apply_breakdown_deltas({('transfer_month', organization.id, created_month(transfer_date)): len(items)})
+    touch_rooms([equipment.room_id for equipment in items] + [new_room.id])
+    
+    transferred = [{
+        'equipment_id': equipment.id,
+        'old_inv_code': equipment.inv_code,
+        'new_inv_code': code
+    } for equipment, code in zip(items, new_codes)]
+    db.session.commit()
+    
+    for qr_text in old_qr_texts:
+        invalidate_qr_cache(qr_text)
+    
+    return jsonify({
+        'success': True,
+        'message': f'{len(transferred)} ta jihoz "{new_room.name}" ga ko\'chirildi',
+        'transferred': transferred
+    })
+
+def organization_room_choices_query(organization_id):
+    """Transfer oynasidagi xonalar ro'yxati (qavat nomi bilan)"""
+    return Room.query.options(joinedload(Room.floor)).filter_by(organization_id=organization_id)
+
+def floor_room_choices_query(floor_id):
+    return Room.query.filter_by(floor_id=floor_id)
+
 # Xonalar ro'yxatini olish (transfer uchun)
 @app.route('/get_rooms/<int:organization_id>')
 def get_rooms(organization_id):
-    rooms = Room.query.filter_by(organization_id=organization_id).all()
-    room_list = []
-    
-    for room in rooms:
-        room_data = {
-            'id': room.id,
-            'name': room.name,
-            'floor_name': room.floor.name if room.floor else None
-        }
-        room_list.append(room_data)
+    def build():
+        rooms = organization_room_choices_query(organization_id).all()
+        room_list = []
+        
+        for room in rooms:
+            room_data = {
+                'id': room.id,
+                'name': room.name,
+                'floor_name': room.floor.name if room.floor else None
+            }
+            room_list.append(room_data)
+        
+        return jsonify(room_list)
     
-    return jsonify(room_list)
+    return conditional_response(entity_etag(Organization, organization_id, 'organization_rooms'), build)
 
 # Qavat bo'yicha xonalarni olish
 @app.route('/get_rooms_by_floor/<int:floor_id>')
 def get_rooms_by_floor(floor_id):
-    rooms = Room.query.filter_by(floor_id=floor_id).all()
-    room_list = []
-    
-    for room in rooms:
-        room_data = {
-            'id': room.id,
-            'name': room.name
-        }
-        room_list.append(room_data)
+    def build():
+        rooms = floor_room_choices_query(floor_id).all()
+        room_list = []
+        
+        for room in rooms:
+            room_data = {
+                'id': room.id,
+                'name': room.name
+            }
+            room_list.append(room_data)
+        
+        return jsonify(room_list)
     
-    return jsonify(room_list)
+    return conditional_response(entity_etag(Floor, floor_id, 'floor_rooms'), build)
+
+def transfer_history_query(equipment_id):
+    return TransferHistory.query.filter_by(equipment_id=equipment_id).order_by(TransferHistory.transfer_date.desc())
 
 # Jihoz transfer tarixini olish
 @app.route('/transfer_history/<int:equipment_id>')
 def get_transfer_history(equipment_id):
-    transfers = TransferHistory.query.filter_by(equipment_id=equipment_id).order_by(TransferHistory.transfer_date.desc()).all()
-    
-    history_list = []
-    for transfer in transfers:
-        history_data = {
-            'id': transfer.id,
-            'from_room': transfer.from_room.name,
-            'to_room': transfer.to_room.name,
-            'old_inv_code': transfer.old_inv_code,
-            'new_inv_code': transfer.new_inv_code,
-            'transfer_date': transfer.transfer_date.strftime('%d.%m.%Y %H:%M'),
-            'notes': transfer.notes or ''
-        }
-        history_list.append(history_data)
+    def build():
+        transfers = transfer_history_query(equipment_id).all()
+        
+        history_list = []
+        for transfer in transfers:
+            history_data = {
+                'id': transfer.id,
+                'from_room': transfer.from_room.name,
+                'to_room': transfer.to_room.name,
+                'old_inv_code': transfer.old_inv_code,
+                'new_inv_code': transfer.new_inv_code,
+                'transfer_date': transfer.transfer_date.strftime('%d.%m.%Y %H:%M'),
+                'notes': transfer.notes or ''
+            }
+            history_list.append(history_data)
+        
+        return jsonify(history_list)
+    
+    return conditional_response(entity_etag(Equipment, equipment_id, 'transfer_history'), build)
+
+# Jihozlar bo'yicha to'liq matnli qidiruv (SQLite FTS5, equipment jadvalining tashqi kontentli indeksi)
+SEARCH_FIELDS = ['inv_code', 'serial_number', 'name', 'brand', 'model', 'description']
+SEARCH_WEIGHTS = [10.0, 10.0, 5.0, 3.0, 3.0, 1.0]  # bm25 uchun ustun og'irliklari (SEARCH_FIELDS tartibida)
+
+def search_index_ddl():
+    """FTS5 jadvali va uni equipment bilan sinxron saqlovchi triggerlar"""
+    fields = ', '.join(SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS equipment_fts USING fts5(
+            {fields}, content='equipment', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS equipment_fts_insert AFTER INSERT ON equipment BEGIN
+            INSERT INTO equipment_fts(rowid, {fields}) VALUES (new.id, {new_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS equipment_fts_delete AFTER DELETE ON equipment BEGIN
+            INSERT INTO equipment_fts(equipment_fts, rowid, {fields}) VALUES ('delete', old.id, {old_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS equipment_fts_update AFTER UPDATE OF {fields} ON equipment BEGIN
+            INSERT INTO equipment_fts(equipment_fts, rowid, {fields}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO equipment_fts(rowid, {fields}) VALUES (new.id, {new_values});
+        END""",
+    ]
+
+def init_search_index():
+    """Qidiruv indeksini yaratish; birinchi marta yaratilganda mavjud jihozlardan to'ldiriladi"""
+    exists = db.session.execute(db.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'equipment_fts'"
+    )).scalar()
     
-    return jsonify(history_list)
+    for statement in search_index_ddl():
+        db.session.execute(db.text(statement))
+    
+    if not exists:
+        db.session.execute(db.text("INSERT INTO equipment_fts(equipment_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+def fts_match_query(text):
+    """Foydalanuvchi matnidan FTS5 MATCH ifodasi: har bir so'z prefiks bo'yicha, barchasi AND"""
+    terms = ['"{}"*'.format(term.replace('"', '""')) for term in text.split()]
+    return ' '.join(terms)
+
+# Barcha tashkilotlar bo'yicha jihoz qidirish
+@app.route('/search')
+def search_equipment():
+    text = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    organization_id = request.args.get('organization_id', type=int)
+    
+    if not text:
+        return jsonify({'error': 'Qidiruv matni (q) kiritilishi shart'}), 400
+    
+    params = {
+        'query': fts_match_query(text),
+        'organization_id': organization_id,
+        'limit': per_page,
+        'offset': (page - 1) * per_page
+    }
+    organization_filter = 'AND r.organization_id = :organization_id' if organization_id else ''
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    
+    # Natijalar va xona/qavat/tashkilot yo'li bitta so'rovda
+    rows = db.session.execute(db.text(f"""
+        SELECT e.id, e.inv_code, e.name, e.category, e.brand, e.model, e.serial_number, e.status,
+               r.id AS room_id, r.name AS room_name,
+               f.id AS floor_id, f.name AS floor_name,
+               o.id AS organization_id, o.name AS organization_name,
+               bm25(equipment_fts, {weights}) AS score
+        FROM equipment_fts
+        JOIN equipment e ON e.id = equipment_fts.rowid
+        JOIN room r ON r.id = e.room_id
+        LEFT JOIN floor f ON f.id = r.floor_id
+        JOIN organization o ON o.id = r.organization_id
+        WHERE equipment_fts MATCH :query {organization_filter}
+        ORDER BY score, e.id
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+    
+    total = db.session.execute(db.text(f"""
+        SELECT count(*)
+        FROM equipment_fts
+        JOIN equipment e ON e.id = equipment_fts.rowid
+        JOIN room r ON r.id = e.room_id
+        WHERE equipment_fts MATCH :query {organization_filter}
+    """ if organization_id else """
+        SELECT count(*) FROM equipment_fts WHERE equipment_fts MATCH :query
+    """), params).scalar()
+    
+    results = []
+    for row in rows:
+        results.append({
+            'id': row['id'],
+            'inv_code': row['inv_code'],
+            'name': row['name'],
+            'category': row['category'],
+            'brand': row['brand'],
+            'model': row['model'],
+            'serial_number': row['serial_number'],
+            'status': row['status'],
+            'score': -row['score'],  # bm25 qanchalik kichik bo'lsa, shunchalik mos
+            'breadcrumbs': {
+                'organization': {'id': row['organization_id'], 'name': row['organization_name']},
+                'floor': {'id': row['floor_id'], 'name': row['floor_name']} if row['floor_id'] else None,
+                'room': {'id': row['room_id'], 'name': row['room_name']}
+            }
+        })
+    
+    return jsonify({
+        'query': text,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'results': results
+    })
+
+# Hisobotlar (faqat yig'ma jadvallardan - javob vaqti jihozlar soniga bog'liq emas)
+REPORT_MAX_MONTHS = 120
+REPORT_AGE_BUCKETS = [(12, '1 yilgacha'), (36, '1-3 yil'), (60, '3-5 yil'), (None, '5 yildan ortiq')]
+REPORT_UNKNOWN_AGE = "Noma'lum"
+
+def last_months(count, today=None):
+    """Joriy oy bilan tugaydigan `count` ta oy: ['YYYY-MM', ...] (eskisidan yangisiga)"""
+    today = today or datetime.utcnow()
+    months = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        months.append(f'{year:04d}-{month:02d}')
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+def age_bucket(month, today=None):
+    """Qo'shilgan oy ('YYYY-MM') bo'yicha yosh guruhi"""
+    if not month:
+        return REPORT_UNKNOWN_AGE
+    today = today or datetime.utcnow()
+    year, number = map(int, month.split('-'))
+    age_months = (today.year - year) * 12 + today.month - number
+    for limit, label in REPORT_AGE_BUCKETS:
+        if limit is None or age_months < limit:
+            return label
+
+def counts_list(counter, key):
+    """Counter -> [{key: qiymat, 'count': son}] (ko'pidan ozigacha)"""
+    return [{key: value, 'count': count} for value, count in counter.most_common()]
+
+def report_summary_query(organization_id=None):
+    """Kategoriya va holat bo'yicha jihozlar soni (tashkilot yoki barcha tashkilotlar)"""
+    query = db.session.query(
+        InventorySummary.category, InventorySummary.status, db.func.sum(InventorySummary.equipment_count)
+    ).filter(InventorySummary.scope == 'organization')
+    if organization_id:
+        query = query.filter(InventorySummary.scope_id == organization_id)
+    return query.group_by(InventorySummary.category, InventorySummary.status)
+
+def report_breakdown_query(organization_id=None):
+    """Brend, oy va oylik transferlar soni (tashkilot yoki barcha tashkilotlar)"""
+    query = db.session.query(
+        InventoryBreakdown.dimension, InventoryBreakdown.value, db.func.sum(InventoryBreakdown.equipment_count)
+    ).filter(InventoryBreakdown.dimension.in_(BREAKDOWN_DIMENSIONS))
+    if organization_id:
+        query = query.filter(InventoryBreakdown.organization_id == organization_id)
+    return query.group_by(InventoryBreakdown.dimension, InventoryBreakdown.value)
+
+def build_report(organization_id=None, months=12):
+    """Kategoriya, holat, brend va yosh bo'yicha sonlar, oylik o'sish va transferlar
+
+    organization_id berilmasa, barcha tashkilotlar bo'yicha. Uchta guruhlangan so'rov
+    yig'ma jadvallardan o'qiydi - jihozlar va transfer tarixi jadvallariga tegilmaydi.
+    """
+    by_category = Counter()
+    by_status = Counter()
+    for category, status, count in report_summary_query(organization_id):
+        by_category[category] += count
+        by_status[status] += count
+    
+    dimensions = {dimension: Counter() for dimension in BREAKDOWN_DIMENSIONS}
+    for dimension, value, count in report_breakdown_query(organization_id):
+        dimensions[dimension][value] = count
+    
+    today = datetime.utcnow()
+    by_age = Counter()
+    for month, count in dimensions['month'].items():
+        by_age[age_bucket(month, today)] += count
+    
+    # O'sish: har oyda qo'shilgan (hozir mavjud) jihozlar va oy oxiridagi jami
+    window = last_months(months, today)
+    total = sum(count for month, count in dimensions['month'].items() if month < window[0])
+    growth = []
+    for month in window:
+        added = dimensions['month'][month]
+        total += added
+        growth.append({'month': month, 'added': added, 'total': total})
+    
+    report = {
+        'organization_id': organization_id,
+        'total': sum(by_category.values()),
+        'by_category': counts_list(by_category, 'category'),
+        'by_status': counts_list(by_status, 'status'),
+        'by_brand': counts_list(dimensions['brand'], 'brand'),
+        'by_age': [
+            {'age': label, 'count': by_age[label]}
+            for label in [label for _, label in REPORT_AGE_BUCKETS] + [REPORT_UNKNOWN_AGE] if by_age[label]
+        ],
+        'growth': growth,
+        'transfers': [{'month': month, 'count': dimensions['transfer_month'][month]} for month in window]
+    }
+    
+    if not organization_id:
+        equipment_counts = equipment_counts_by('organization')
+        report['organizations'] = [
+            {'id': org_id, 'name': name, 'count': count}
+            for org_id, name, count in db.session.query(
+                Organization.id, Organization.name, db.func.coalesce(equipment_counts.c.equipment_count, 0)
+            ).outerjoin(equipment_counts, equipment_counts.c.group_id == Organization.id).order_by(Organization.id)
+        ]
+    return report
+
+def report_args():
+    """Hisobot parametrlari: (tashkilot yoki None, oylar soni)"""
+    organization_id = request.args.get('organization_id', type=int)
+    months = min(max(request.args.get('months', 12, type=int), 1), REPORT_MAX_MONTHS)
+    organization = Organization.query.get_or_404(organization_id) if organization_id else None
+    return organization, months
+
+# Hisobotlar sahifasi
+@app.route('/reports')
+def reports_page():
+    organization, months = report_args()
+    report = build_report(organization.id if organization else None, months)
+    organizations = db.session.query(Organization.id, Organization.name).order_by(Organization.name).all()
+    return render_template('reports.html', report=report, organization=organization,
+                           organizations=organizations, months=months)
+
+# Hisobot ma'lumotlari (JSON)
+@app.route('/reports/data')
+def reports_data():
+    organization, months = report_args()
+    report = build_report(organization.id if organization else None, months)
+    if organization:
+        report['organization_name'] = organization.name
+    return jsonify(report)
 
 # Excel fayl yuklash sahifasi
 @app.route('/upload_excel/<int:organization_id>')
@@ -543,217 +2135,468 @@ def upload_excel_page(organization_id):
     organization = Organization.query.get_or_404(organization_id)
     return render_template('upload_excel.html', organization=organization)
 
-# Excel fayl yuklash va ma'lumotlarni import qilish
-@app.route('/import_excel/<int:organization_id>', methods=['POST'])
-def import_excel(organization_id):
-    try:
-        if 'file' not in request.files:
-            return jsonify({'success': False, 'message': 'Fayl tanlanmagan'})
+# Excel import ustunlari: Excel sarlavhasi -> jihoz maydoni
+IMPORT_COLUMNS = {
+    'P/N(Cihaz Adı)': 'name',
+    'COMPANY(marka)': 'brand',
+    'MODEL(Model)': 'model',
+    'S/N(Seri Numarası)': 'serial_number',
+    'rangi(Renk)': 'color',
+    'ин/в(Envanter Numarası)': 'inv_code',
+    'O\'lchov birligi(Miktar)': 'quantity',
+    'Holati(durum)': 'status',
+    'Kim foydalanayapti(Kim kullanmış)': 'user',
+}
+
+IMPORT_FIELDS = ['inv_code', 'name', 'brand', 'model', 'serial_number', 'color', 'status', 'description']
+
+def clean_import_frame(df):
+    """Excel ma'lumotlarini pandas ustun amallari bilan tozalash (qatorma-qator emas)
+
+    DataFrame indeksi sarlavhadan keyingi qator tartib raqami (0 -> Excel 2-qator).
+    """
+    import pandas as pd
+    
+    cleaned = pd.DataFrame(index=df.index)
+    
+    for column, field in IMPORT_COLUMNS.items():
+        values = df[column]
+        cleaned[field] = values.astype(str).str.strip().where(values.notna(), '')
+    
+    cleaned['status'] = cleaned['status'].where(df['Holati(durum)'].notna(), 'Active')
+    cleaned['description'] = 'Miqdor: ' + cleaned['quantity'] + '\nFoydalanuvchi: ' + cleaned['user']
+    cleaned['row_number'] = df.index + 2
+    
+    return cleaned
+
+def iter_xlsx_batches(rows, header, batch_size):
+    """read_only varaq qatorlarini belgilangan o'lchamdagi DataFrame bo'laklariga yig'ish
+
+    Butun varaq xotiraga yuklanmaydi - bir vaqtda faqat bitta bo'lak saqlanadi.
+    To'liq bo'sh qatorlar o'tkazib yuboriladi.
+    """
+    import pandas as pd
+    
+    positions = [header.index(column) for column in IMPORT_COLUMNS]
+    index = []
+    batch = []
+    
+    for row_index, row in enumerate(rows):
+        values = [row[position] if position < len(row) else None for position in positions]
+        if all(value is None for value in values):
+            continue
         
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'success': False, 'message': 'Fayl tanlanmagan'})
+        index.append(row_index)
+        batch.append(values)
+        if len(batch) >= batch_size:
+            yield pd.DataFrame(batch, columns=list(IMPORT_COLUMNS), index=index)
+            index = []
+            batch = []
+    
+    if batch:
+        yield pd.DataFrame(batch, columns=list(IMPORT_COLUMNS), index=index)
+
+def iter_excel_import_batches(path, chunk_size):
+    """Excel fayldan import bo'laklarini o'qish (.xlsx - oqim rejimida, .xls - pandas orqali)
+
+    Sarlavhada kerakli ustunlar bo'lmasa ValueError ko'tariladi.
+    """
+    if path.endswith('.xlsx'):
+        # .xlsx oqim (read_only) rejimida o'qiladi - xotira fayl hajmiga bog'liq emas
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = ['' if value is None else str(value) for value in next(rows, ())]
+            check_import_header(header)
+            yield from iter_xlsx_batches(rows, header, chunk_size)
+        finally:
+            workbook.close()
+    else:
+        # Eski .xls formatni faqat pandas o'qiy oladi
+        import pandas as pd
+        df = pd.read_excel(path)
+        check_import_header(list(df.columns))
+        yield df
+
+def iter_xlsx_import_codes(path):
+    """.xlsx fayldagi inventarizatsiya kodlari (faqat kod ustuni, oqim rejimida)"""
+    from openpyxl import load_workbook
+    
+    code_column = next(column for column, field in IMPORT_COLUMNS.items() if field == 'inv_code')
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        header = ['' if value is None else str(value) for value in next(workbook.active.iter_rows(values_only=True), ())]
+        if code_column not in header:
+            return
+        position = header.index(code_column) + 1
+        for (value,) in workbook.active.iter_rows(min_row=2, min_col=position, max_col=position, values_only=True):
+            if value is not None:
+                yield str(value).strip()
+    finally:
+        workbook.close()
+
+def check_import_header(header):
+    """Excel sarlavhasida kerakli ustunlar borligini tekshirish"""
+    missing_columns = [col for col in IMPORT_COLUMNS if col not in header]
+    if missing_columns:
+        raise ValueError(f'Quyidagi ustunlar topilmadi: {", ".join(missing_columns)}')
+
+def import_equipment_frame(path, cleaned, chunk_size=None, progress=None):
+    """Tozalangan qatorlarni xonaga (path - ierarxiya keshidagi RoomPath) bo'laklab (executemany) yozish
+
+    Kodi yo'q qatorlar uchun inventarizatsiya kodlari bitta blok bilan ajratiladi.
+    Har bir bo'lak yozilgandan keyin progress(qatorlar, import_qilingan, xatoliklar)
+    chaqiriladi. Commit chaqiruvchi tomonidan bajariladi.
+    Natija: (import_qilingan_soni, xatoliklar_ro'yxati)
+    """
+    chunk_size = chunk_size or app.config['IMPORT_CHUNK_SIZE']
+    imported_at = datetime.utcnow()
+    imported_count = 0
+    errors = []
+    
+    # Excel dagi kodlar ketma-ketliklarda hisobga olinadi (keyingi ajratishlar ularni bermaydi)
+    cleaned = cleaned.copy()
+    advance_inv_code_sequences(cleaned.loc[cleaned['inv_code'] != '', 'inv_code'].tolist())
+    
+    # Inventarizatsiya kodlarini bitta blok bilan ajratish
+    missing_code = (cleaned['inv_code'] == '') & (cleaned['name'] != '')
+    missing_count = int(missing_code.sum())
+    if missing_count:
+        prefix = inv_code_prefix(path.organization_name, path.room_name)
+        cleaned.loc[missing_code, 'inv_code'] = allocate_inv_codes(prefix, missing_count)
+    
+    for start in range(0, len(cleaned), chunk_size):
+        chunk = cleaned.iloc[start:start + chunk_size]
         
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            return jsonify({'success': False, 'message': 'Faqat Excel fayllar (.xlsx, .xls) qabul qilinadi'})
+        # Bo'sh nomli qatorlar
+        empty_name = chunk['name'] == ''
+        chunk_errors = [f'Satr {row_number}: Jihoz nomi bo\'sh' for row_number in chunk.loc[empty_name, 'row_number']]
+        chunk = chunk.loc[~empty_name]
         
-        # Excel faylni o'qish
-        df = pd.read_excel(file)
+        # Takroriy kodlarni tekshirish (bo'lak ichida va bazada)
+        codes = chunk['inv_code']
+        existing_codes = {
+            code for (code,) in db.session.query(Equipment.inv_code).filter(Equipment.inv_code.in_(codes.tolist()))
+        }
+        duplicate = codes.duplicated() | codes.isin(existing_codes)
+        for row_number, code in zip(chunk.loc[duplicate, 'row_number'], codes[duplicate]):
+            chunk_errors.append(f'Satr {row_number}: "{code}" inventarizatsiya kodi allaqachon mavjud')
         
-        # Ustunlarni tekshirish
-        required_columns = [
-            'P/N(Cihaz Adı)', 'COMPANY(marka)', 'MODEL(Model)', 
-            'S/N(Seri Numarası)', 'rangi(Renk)', 'ин/в(Envanter Numarası)',
-            'O\'lchov birligi(Miktar)', 'Holati(durum)', 'Kim foydalanayapti(Kim kullanmış)'
+        new_rows = chunk.loc[~duplicate]
+        rows = [
+            # Import qilingan jihozlar uchun kategoriya: 'Import'
+            dict(zip(IMPORT_FIELDS, values), room_id=path.room_id, category='Import', created_at=imported_at)
+            for values in zip(*(new_rows[field].tolist() for field in IMPORT_FIELDS))
         ]
         
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return jsonify({
-                'success': False, 
-                'message': f'Quyidagi ustunlar topilmadi: {", ".join(missing_columns)}'
-            })
+        if rows:
+            db.session.execute(Equipment.__table__.insert(), rows)
+            update_inventory_summary(Counter(
+                (path.room_id, row['category'], row['status'], row['brand'], created_month(imported_at)) for row in rows
+            ))
+            touch_rooms([path.room_id])
         
-        # Xona va qavat ma'lumotlarini olish
-        room_id = request.form.get('room_id')
-        floor_id = request.form.get('floor_id')
-        
-        if not room_id:
-            return jsonify({'success': False, 'message': 'Xona tanlanmagan'})
-        
-        room = Room.query.get(room_id)
-        if not room:
-            return jsonify({'success': False, 'message': 'Xona topilmadi'})
-        
-        # Ma'lumotlarni import qilish
-        imported_count = 0
+        imported_count += len(rows)
+        errors.extend(chunk_errors)
+        if progress:
+            progress(len(empty_name), len(rows), chunk_errors)
+    
+    return imported_count, errors
+
+def run_import_job(job_id, path):
+    """Excel importni fon oqimida bajarish
+
+    Har bir bo'lak o'z tranzaksiyasida yoziladi va vazifa holati (qatorlar soni,
+    xatoliklar) shu commit bilan birga saqlanadi, shuning uchun /jobs/<id>
+    import davomida ham aniq holatni ko'rsatadi.
+    """
+    with app.app_context():
+        job = ImportJob.query.get(job_id)
+        job.status = 'running'
+        db.session.commit()
         errors = []
         
-        for index, row in df.iterrows():
-            try:
-                # Ma'lumotlarni tozalash
-                name = str(row['P/N(Cihaz Adı)']).strip() if pd.notna(row['P/N(Cihaz Adı)']) else ''
-                brand = str(row['COMPANY(marka)']).strip() if pd.notna(row['COMPANY(marka)']) else ''
-                model = str(row['MODEL(Model)']).strip() if pd.notna(row['MODEL(Model)']) else ''
-                serial_number = str(row['S/N(Seri Numarası)']).strip() if pd.notna(row['S/N(Seri Numarası)']) else ''
-                color = str(row['rangi(Renk)']).strip() if pd.notna(row['rangi(Renk)']) else ''
-                inv_code = str(row['ин/в(Envanter Numarası)']).strip() if pd.notna(row['ин/в(Envanter Numarası)']) else ''
-                quantity = str(row['O\'lchov birligi(Miktar)']).strip() if pd.notna(row['O\'lchov birligi(Miktar)']) else ''
-                status = str(row['Holati(durum)']).strip() if pd.notna(row['Holati(durum)']) else 'Active'
-                user = str(row['Kim foydalanayapti(Kim kullanmış)']).strip() if pd.notna(row['Kim foydalanayapti(Kim kullanmış)']) else ''
-                
-                if not name:
-                    errors.append(f'Satr {index + 2}: Jihoz nomi bo\'sh')
-                    continue
-                
-                # Inventarizatsiya kodi yaratish
-                if not inv_code:
-                    equipment_count = Equipment.query.filter_by(room_id=room_id).count() + 1
-                    inv_code = f"{room.organization.name[:3].upper()}-{room.name[:3].upper()}-{equipment_count:04d}"
-                
-                # Jihoz yaratish
-                equipment = Equipment(
-                    inv_code=inv_code,
-                    name=name,
-                    category='Import',  # Import qilingan jihozlar uchun
-                    brand=brand,
-                    model=model,
-                    serial_number=serial_number,
-                    color=color,
-                    status=status,
-                    description=f"Miqdor: {quantity}\nFoydalanuvchi: {user}",
-                    room_id=room_id
+        def save_progress(rows, imported, chunk_errors):
+            job.rows_processed += rows
+            job.imported_count += imported
+            errors.extend(chunk_errors)
+            job.error_count = len(errors)
+            if chunk_errors:
+                job.errors = '\n'.join(errors)
+            db.session.commit()
+            # Butun fayl bo'yicha yig'ilgan sonlar (bo'laklar kesimida emas)
+            app.logger.info('Excel import #%d: %d qator, %d ta import qilindi',
+                            job.id, job.rows_processed, job.imported_count)
+        
+        try:
+            # Tashkilot nomi ierarxiya keshidan bir marta olinadi (kod prefiksi uchun)
+            room = hierarchy().room_path(job.room_id)
+            if room is None:
+                raise ValueError('Xona topilmadi')
+            chunk_size = app.config['IMPORT_CHUNK_SIZE']
+            
+            if path.endswith('.xlsx'):
+                # .xlsx bo'laklab o'qiladi: xona prefiksidagi Excel kodlari oldindan hisobga olinmasa,
+                # oldingi bo'laklarda ajratilgan kodlar keyingi bo'laklardagi shu kodlarni "mavjud" qiladi
+                # (.xls bitta bo'lak - import_equipment_frame o'zi hisobga oladi)
+                prefix = inv_code_prefix(room.organization_name, room.room_name)
+                advance_inv_code_sequences(
+                    code for code in iter_xlsx_import_codes(path) if code.startswith(f"{prefix}-")
                 )
-                
-                db.session.add(equipment)
-                imported_count += 1
-                
-            except Exception as e:
-                errors.append(f'Satr {index + 2}: {str(e)}')
-                continue
+                db.session.commit()
+            
+            for batch in iter_excel_import_batches(path, chunk_size):
+                import_equipment_frame(room, clean_import_frame(batch), chunk_size, save_progress)
+            
+            job.status = 'done'
+            job.message = f'{job.imported_count} ta jihoz muvaffaqiyatli import qilindi'
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.message = f'Import xatoligi: {str(e)}'
+        finally:
+            os.remove(path)
         
+        job.finished_at = datetime.utcnow()
         db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': f'{imported_count} ta jihoz muvaffaqiyatli import qilindi',
-            'imported_count': imported_count,
-            'errors': errors[:10]  # Faqat birinchi 10 ta xatolik
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Import xatoligi: {str(e)}'})
 
-# Excel export funksiyasi
-def create_excel_export(organization_id):
-    """Tashkilot ma'lumotlarini Excel faylga export qilish"""
-    organization = Organization.query.get_or_404(organization_id)
+def import_job_to_dict(job):
+    """Import vazifasi holatini JSON uchun tayyorlash"""
+    errors = job.errors.split('\n') if job.errors else []
+    return {
+        'id': job.id,
+        'status': job.status,
+        'finished': job.status in ('done', 'failed'),
+        'success': job.status != 'failed',
+        'filename': job.filename,
+        'room_id': job.room_id,
+        'rows_processed': job.rows_processed,
+        'imported_count': job.imported_count,
+        'error_count': job.error_count,
+        'errors': errors[:10],  # To'liq ro'yxat /jobs/<id>/errors orqali yuklab olinadi
+        'message': job.message,
+        'created_at': job.created_at.strftime('%d.%m.%Y %H:%M:%S'),
+        'finished_at': job.finished_at.strftime('%d.%m.%Y %H:%M:%S') if job.finished_at else None
+    }
+
+# Excel fayl yuklash va import vazifasini yaratish
+@app.route('/import_excel/<int:organization_id>', methods=['POST'])
+def import_excel(organization_id):
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'message': 'Fayl tanlanmagan'})
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'success': False, 'message': 'Fayl tanlanmagan'})
     
-    # Yangi Excel workbook yaratish
-    wb = Workbook()
+    if not file.filename.endswith(('.xlsx', '.xls')):
+        return jsonify({'success': False, 'message': 'Faqat Excel fayllar (.xlsx, .xls) qabul qilinadi'})
+    
+    # Xona ma'lumotlarini olish
+    room_id = request.form.get('room_id')
+    
+    if not room_id:
+        return jsonify({'success': False, 'message': 'Xona tanlanmagan'})
+    
+    room = Room.query.get(room_id)
+    if not room:
+        return jsonify({'success': False, 'message': 'Xona topilmadi'})
+    
+    # Faylni vaqtinchalik saqlash (so'rov tugagach yuklangan oqim yopiladi)
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file.filename)[1])
+    with os.fdopen(fd, 'wb') as output:
+        file.save(output)
+    
+    job = ImportJob(organization_id=organization_id, room_id=room.id, filename=file.filename, worker_pid=os.getpid())
+    db.session.add(job)
+    db.session.commit()
+    
+    import_executor.submit(run_import_job, job.id, path)
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'message': 'Fayl qabul qilindi, import fon rejimida bajarilmoqda'
+    }), 202
+
+# Import vazifasi holatini olish
+@app.route('/jobs/<int:job_id>')
+def get_import_job(job_id):
+    job = ImportJob.query.get_or_404(job_id)
+    return jsonify(import_job_to_dict(job))
+
+# Import vazifasining barcha xatoliklarini yuklab olish
+@app.route('/jobs/<int:job_id>/errors')
+def download_import_job_errors(job_id):
+    job = ImportJob.query.get_or_404(job_id)
+    return send_file(
+        io.BytesIO((job.errors or '').encode('utf-8')),
+        as_attachment=True,
+        download_name=f'import_{job.id}_xatoliklar.txt',
+        mimetype='text/plain; charset=utf-8'
+    )
+
+# Excel export ustunlari
+EXPORT_HEADERS = [
+    'Inv Kode', 'Nomi', 'Kategoriya', 'Brend', 'Model',
+    'Seriya Raqami', 'Rang', 'Holat', 'Tavsif'
+]
+
+def create_export_workbook():
+    """Write-only workbook va barcha kataklar uchun umumiy (named) stillarni yaratish
+
+    Stil obyektlari har bir katak uchun qayta yaratilmaydi - kataklarga faqat
+    stil nomi beriladi.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
     
-    # Default sheet ni o'chirish
-    wb.remove(wb.active)
+    wb = Workbook(write_only=True)
     
-    # Stil parametrlari
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
     border = Border(
         left=Side(style='thin'),
         right=Side(style='thin'),
         top=Side(style='thin'),
         bottom=Side(style='thin')
     )
+    wb.add_named_style(NamedStyle(
+        name='export_header',
+        font=Font(bold=True, color="FFFFFF"),
+        fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+        alignment=Alignment(horizontal='center', vertical='center'),
+        border=border
+    ))
+    wb.add_named_style(NamedStyle(
+        name='export_cell',
+        alignment=Alignment(vertical='center'),
+        border=border
+    ))
+    wb.add_named_style(NamedStyle(name='export_title', font=Font(bold=True, size=14)))
+    wb.add_named_style(NamedStyle(name='export_bold', font=Font(bold=True)))
+    
+    return wb
+
+def styled_cell(ws, value, style):
+    """Write-only sheet uchun nomlangan stilli katak"""
+    from openpyxl.cell import WriteOnlyCell
     
-    if organization.has_floors:
-        # Qavatli tashkilot uchun
-        floors = Floor.query.filter_by(organization_id=organization_id).all()
-        
-        for floor in floors:
-            rooms = Room.query.filter_by(floor_id=floor.id).all()
-            
-            for room in rooms:
-                # Sheet nomi: "Qavat - Xona"
-                sheet_name = f"{floor.name} - {room.name}"
-                # Excel sheet nomi cheklovlari (31 ta belgi)
-                if len(sheet_name) > 31:
-                    sheet_name = sheet_name[:31]
-                
-                ws = wb.create_sheet(title=sheet_name)
-                
-                # Ma'lumotlarni yozish
-                write_room_data_to_sheet(ws, room, header_font, header_fill, border)
-    else:
-        # Oddiy tashkilot uchun
-        rooms = Room.query.filter_by(organization_id=organization_id, floor_id=None).all()
-        
-        for room in rooms:
-            # Sheet nomi: faqat xona nomi
-            sheet_name = room.name
-            if len(sheet_name) > 31:
-                sheet_name = sheet_name[:31]
-            
-            ws = wb.create_sheet(title=sheet_name)
-            
-            # Ma'lumotlarni yozish
-            write_room_data_to_sheet(ws, room, header_font, header_fill, border)
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+def set_export_column_widths(ws):
+    """Export ustunlari kengligini belgilash"""
+    from openpyxl.utils import get_column_letter
     
-    # Excel faylni memory ga yozish
-    output = io.BytesIO()
+    for col in range(1, len(EXPORT_HEADERS) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 15
+
+def export_equipment_columns():
+    """Export qatori uchun Equipment ustunlari (EXPORT_HEADERS tartibida)"""
+    return [
+        Equipment.inv_code,
+        Equipment.name,
+        Equipment.category,
+        Equipment.brand,
+        Equipment.model,
+        Equipment.serial_number,
+        Equipment.color,
+        Equipment.status,
+        Equipment.description
+    ]
+
+def write_equipment_rows(ws, rows):
+    """Jihozlar qatorlarini (export_equipment_columns tartibida) write-only sheet ga yozish
+
+    Har bir ustun uchun bitta stilli katak yaratiladi va har qatorda faqat uning
+    qiymati almashtiriladi - append() qatorni darhol faylga yozib yuboradi.
+    """
+    cells = [styled_cell(ws, None, 'export_cell') for _ in EXPORT_HEADERS]
+    
+    for values in rows:
+        for cell, value in zip(cells, values):
+            cell.value = '' if value is None else value
+        ws.append(cells)
+
+def save_export_workbook(wb):
+    """Workbookni xotiraga emas, vaqtinchalik faylga yozish"""
+    output = tempfile.TemporaryFile()
     wb.save(output)
     output.seek(0)
-    
     return output
 
-def write_room_data_to_sheet(ws, room, header_font, header_fill, border):
-    """Xona ma'lumotlarini sheet ga yozish"""
+def organization_floor_ids_query(organization_id):
+    return db.session.query(Floor.id).filter(Floor.organization_id == organization_id)
+
+def organization_export_query(organization_id, has_floors):
+    """Xona - jihoz qatorlari xonalar tartibida (jihozsiz xonalar ham bitta qator bilan)"""
+    query = (
+        db.session.query(Room.id, Room.name, Room.floor_id, Equipment.id, *export_equipment_columns())
+        .outerjoin(Equipment, Equipment.room_id == Room.id)
+    )
     
-    # Sarlavhalar
-    headers = [
-        'Inv Kode', 'Nomi', 'Kategoriya', 'Brend', 'Model',
-        'Seriya Raqami', 'Rang', 'Holat', 'Tavsif'
-    ]
+    if has_floors:
+        # Qavatli tashkilot uchun: qavatlardagi xonalar
+        query = query.filter(Room.organization_id == organization_id, Room.floor_id.isnot(None))
+    else:
+        # Oddiy tashkilot uchun: qavatsiz xonalar
+        query = query.filter(Room.organization_id == organization_id, Room.floor_id.is_(None))
+    
+    return query.order_by(Room.floor_id, Room.id, Equipment.id)
+
+def room_export_query(room_id):
+    return db.session.query(*export_equipment_columns()).filter(Equipment.room_id == room_id).order_by(Equipment.id)
+
+# Excel export funksiyasi
+def create_excel_export(organization_id):
+    """Tashkilot ma'lumotlarini Excel faylga export qilish
+
+    Barcha xonalar va jihozlar bitta tartiblangan so'rov bilan olinadi
+    (xonalar soniga bog'liq bo'lmagan so'rovlar soni) va sheet larga
+    oqim davomida ajratiladi. Tashkilot va qavat nomlari ierarxiya keshidan.
+    """
+    organization = hierarchy().organization(organization_id) or abort(404)
+    # Qavat nomlari: id lar indeksdan, topilmaganlari keshga bitta so'rov bilan
+    floors = hierarchy().floors(floor_id for (floor_id,) in organization_floor_ids_query(organization_id))
+    
+    # Yangi write-only Excel workbook yaratish
+    wb = create_export_workbook()
+    
+    query = organization_export_query(organization_id, organization.has_floors).yield_per(1000)
+    for (room_id, room_name, floor_id), rows in groupby(query, key=lambda row: row[:3]):
+        # Sheet nomi: qavatli tashkilotda "Qavat - Xona", aks holda faqat xona nomi
+        sheet_name = f"{floors[floor_id].name} - {room_name}" if organization.has_floors else room_name
+        # Excel sheet nomi cheklovlari (31 ta belgi)
+        if len(sheet_name) > 31:
+            sheet_name = sheet_name[:31]
+        
+        ws = wb.create_sheet(title=sheet_name)
+        
+        # Ma'lumotlarni yozish
+        write_room_data_to_sheet(ws, (row[4:] for row in rows if row[3] is not None))
+    
+    # Excel faylni vaqtinchalik faylga yozish
+    return save_export_workbook(wb)
+
+def write_room_data_to_sheet(ws, rows):
+    """Xona ma'lumotlarini write-only sheet ga yozish"""
+    
+    # Ustunlarni kengaytirish (write-only rejimda qatorlardan oldin berilishi kerak)
+    set_export_column_widths(ws)
     
     # Sarlavhalarni yozish
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
+    ws.append([styled_cell(ws, header, 'export_header') for header in EXPORT_HEADERS])
     
     # Jihozlar ma'lumotlarini yozish
-    equipment_list = Equipment.query.filter_by(room_id=room.id).all()
-    
-    for row, equipment in enumerate(equipment_list, 2):
-        data = [
-            equipment.inv_code,
-            equipment.name,
-            equipment.category,
-            equipment.brand or '',
-            equipment.model or '',
-            equipment.serial_number or '',
-            equipment.color or '',
-            equipment.status,
-            equipment.description or ''
-        ]
-        
-        for col, value in enumerate(data, 1):
-            cell = ws.cell(row=row, column=col, value=value)
-            cell.border = border
-            cell.alignment = Alignment(vertical='center')
-    
-    # Ustunlarni kengaytirish
-    for col in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col)
-        ws.column_dimensions[column_letter].width = 15
+    write_equipment_rows(ws, rows)
 
 # Excel export endpoint
 @app.route('/export_excel/<int:organization_id>')
 def export_excel(organization_id):
     """Tashkilot ma'lumotlarini Excel faylga export qilish"""
     try:
-        organization = Organization.query.get_or_404(organization_id)
+        organization = hierarchy().organization(organization_id) or abort(404)
         
         # Excel fayl yaratish
         excel_file = create_excel_export(organization_id)
@@ -773,100 +2616,53 @@ def export_excel(organization_id):
 
 # Xona uchun Excel export funksiyasi
 def create_room_excel_export(room_id):
-    """Xona ma'lumotlarini Excel faylga export qilish"""
-    room = Room.query.get_or_404(room_id)
+    """Xona ma'lumotlarini Excel faylga export qilish (nomlar ierarxiya keshidan)"""
+    path = hierarchy().room_path(room_id) or abort(404)
     
-    # Yangi Excel workbook yaratish
-    wb = Workbook()
-    ws = wb.active
-    ws.title = room.name[:31]  # Excel sheet nomi cheklovlari
+    # Yangi write-only Excel workbook yaratish
+    wb = create_export_workbook()
+    ws = wb.create_sheet(title=path.room_name[:31])  # Excel sheet nomi cheklovlari
     
-    # Stil parametrlari
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+    # Ustunlarni kengaytirish (write-only rejimda qatorlardan oldin berilishi kerak)
+    set_export_column_widths(ws)
     
     # Xona ma'lumotlari
-    ws.cell(row=1, column=1, value=f"Xona: {room.name}")
-    ws.cell(row=1, column=1).font = Font(bold=True, size=14)
+    ws.append([styled_cell(ws, f"Xona: {path.room_name}", 'export_title')])
     
-    if room.floor:
-        ws.cell(row=2, column=1, value=f"Qavat: {room.floor.name}")
-        ws.cell(row=2, column=1).font = Font(bold=True)
+    if path.floor_id:
+        ws.append([styled_cell(ws, f"Qavat: {path.floor_name}", 'export_bold')])
+    else:
+        ws.append([])
     
-    ws.cell(row=3, column=1, value=f"Tashkilot: {room.organization.name}")
-    ws.cell(row=3, column=1).font = Font(bold=True)
+    ws.append([styled_cell(ws, f"Tashkilot: {path.organization_name}", 'export_bold')])
     
     # Bo'sh qator
-    ws.cell(row=4, column=1, value="")
-    
-    # Sarlavhalar
-    headers = [
-        'Inv Kode', 'Nomi', 'Kategoriya', 'Brend', 'Model',
-        'Seriya Raqami', 'Rang', 'Holat', 'Tavsif'
-    ]
+    ws.append([])
     
     # Sarlavhalarni yozish
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=5, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
+    ws.append([styled_cell(ws, header, 'export_header') for header in EXPORT_HEADERS])
     
     # Jihozlar ma'lumotlarini yozish
-    equipment_list = Equipment.query.filter_by(room_id=room_id).all()
-    
-    for row, equipment in enumerate(equipment_list, 6):
-        data = [
-            equipment.inv_code,
-            equipment.name,
-            equipment.category,
-            equipment.brand or '',
-            equipment.model or '',
-            equipment.serial_number or '',
-            equipment.color or '',
-            equipment.status,
-            equipment.description or ''
-        ]
-        
-        for col, value in enumerate(data, 1):
-            cell = ws.cell(row=row, column=col, value=value)
-            cell.border = border
-            cell.alignment = Alignment(vertical='center')
-    
-    # Ustunlarni kengaytirish
-    for col in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col)
-        ws.column_dimensions[column_letter].width = 15
-    
-    # Excel faylni memory ga yozish
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    write_equipment_rows(ws, room_export_query(room_id).yield_per(1000))
     
-    return output
+    # Excel faylni vaqtinchalik faylga yozish
+    return save_export_workbook(wb)
 
 # Xona uchun Excel export endpoint
 @app.route('/export_room_excel/<int:room_id>')
 def export_room_excel(room_id):
     """Xona ma'lumotlarini Excel faylga export qilish"""
     try:
-        room = Room.query.get_or_404(room_id)
+        path = hierarchy().room_path(room_id) or abort(404)
         
         # Excel fayl yaratish
         excel_file = create_room_excel_export(room_id)
         
         # Fayl nomi
-        if room.floor:
-            filename = f"{room.organization.name}_{room.floor.name}_{room.name}_inventarizatsiya.xlsx"
+        if path.floor_id:
+            filename = f"{path.organization_name}_{path.floor_name}_{path.room_name}_inventarizatsiya.xlsx"
         else:
-            filename = f"{room.organization.name}_{room.name}_inventarizatsiya.xlsx"
+            filename = f"{path.organization_name}_{path.room_name}_inventarizatsiya.xlsx"
         
         return send_file(
             excel_file,
@@ -878,7 +2674,290 @@ def export_room_excel(room_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
+def add_missing_columns():
+    """create_all mavjud jadvallarga yangi ustunlarni qo'shmaydi: server_default li (masalan, version)
+    va NULL bo'lishi mumkin bo'lgan ustunlar eski bazalarga ALTER TABLE ... ADD COLUMN bilan qo'shiladi"""
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or (column.server_default is None and not column.nullable):
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                not_null = '' if column.nullable else ' NOT NULL'
+                default = '' if column.server_default is None else f' DEFAULT {column.server_default.arg}'
+                connection.execute(db.text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{not_null}{default}'
+                ))
+
+def fail_interrupted_import_jobs(*criteria):
+    """Tugallanmagan import vazifalarini "failed" qilish (bajarayotgan jarayon to'xtagan).
+    Ishga tushirishda barcha vazifalar uchun, gunicorn da ishchi chiqqanda uning vazifalari uchun."""
+    ImportJob.query.filter(ImportJob.status.in_(['pending', 'running']), *criteria).update({
+        'status': 'failed',
+        'message': 'Import xatoligi: server qayta ishga tushirildi',
+        'finished_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+
+def init_db():
+    """Jadvallar, indekslar, qidiruv indeksi va yig'ma jadvalni yaratish, yarim qolgan import vazifalarini yopish"""
+    inspector = db.inspect(db.engine)
+    summary_exists = all(inspector.has_table(model.__tablename__) for model in (InventorySummary, InventoryBreakdown))
+    db.create_all()
+    
+    add_missing_columns()
+    
+    # create_all mavjud jadvallarga yangi indekslarni qo'shmaydi
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    
+    init_search_index()
+    
+    # Yig'ma jadvallar yangi yaratilgan bo'lsa, mavjud ma'lumotlardan bir marta to'ldiriladi
+    if not summary_exists:
+        rebuild_inventory_summary()
+    
+    fail_interrupted_import_jobs()
+
+# So'rovlar vaqti va SQL statistikasi (METRICS_ENABLED bo'lganda).
+# Har bir jarayon o'z hisoblagichlarini saqlaydi (gunicorn da ishchi bo'yicha).
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_QUERY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+class RequestMetrics:
+    """Marshrut bo'yicha kechikish va so'rovlar soni gistogrammalari, SQL vaqti hisoblagichlari"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # (route, method, status) -> soni
+        self.latency = {}  # (route, method) -> [bucket soni..., yig'indi, soni]
+        self.queries = {}  # (route, method) -> [bucket soni..., yig'indi, soni]
+        self.db_seconds = {}  # (route, method) -> sekund
+
+    @staticmethod
+    def observe(histograms, key, buckets, value):
+        histogram = histograms.setdefault(key, [0] * len(buckets) + [0, 0])
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[index] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def record(self, route, method, status, seconds, query_count, db_seconds):
+        key = (route, method)
+        with self.lock:
+            self.requests[(route, method, status)] = self.requests.get((route, method, status), 0) + 1
+            self.observe(self.latency, key, METRICS_LATENCY_BUCKETS, seconds)
+            self.observe(self.queries, key, METRICS_QUERY_BUCKETS, query_count)
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + db_seconds
+
+    @staticmethod
+    def labels(**values):
+        escaped = (f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                   for name, value in values.items())
+        return '{' + ','.join(escaped) + '}'
+
+    def histogram_lines(self, name, histograms, buckets):
+        lines = []
+        for (route, method), histogram in sorted(histograms.items()):
+            for bound, count in zip(buckets, histogram):
+                lines.append(f'{name}_bucket{self.labels(route=route, method=method, le=bound)} {count}')
+            lines.append(f'{name}_bucket{self.labels(route=route, method=method, le="+Inf")} {histogram[-1]}')
+            lines.append(f'{name}_sum{self.labels(route=route, method=method)} {histogram[-2]}')
+            lines.append(f'{name}_count{self.labels(route=route, method=method)} {histogram[-1]}')
+        return lines
+
+    def render(self):
+        """Prometheus text formati (0.0.4)"""
+        with self.lock:
+            lines = [
+                '# HELP inventory_http_requests_total HTTP so\'rovlar soni',
+                '# TYPE inventory_http_requests_total counter',
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'inventory_http_requests_total{self.labels(route=route, method=method, status=status)} {count}')
+            
+            lines += [
+                '# HELP inventory_http_request_duration_seconds So\'rovni bajarish vaqti',
+                '# TYPE inventory_http_request_duration_seconds histogram',
+            ]
+            lines += self.histogram_lines('inventory_http_request_duration_seconds', self.latency, METRICS_LATENCY_BUCKETS)
+            
+            lines += [
+                '# HELP inventory_db_queries_per_request Bitta HTTP so\'rovdagi SQL so\'rovlar soni',
+                '# TYPE inventory_db_queries_per_request histogram',
+            ]
+            lines += self.histogram_lines('inventory_db_queries_per_request', self.queries, METRICS_QUERY_BUCKETS)
+            
+            lines += [
+                '# HELP inventory_db_seconds_total SQL so\'rovlarga ketgan umumiy vaqt',
+                '# TYPE inventory_db_seconds_total counter',
+            ]
+            for (route, method), seconds in sorted(self.db_seconds.items()):
+                lines.append(f'inventory_db_seconds_total{self.labels(route=route, method=method)} {seconds}')
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+@app.before_request
+def start_request_metrics():
+    if app.config['METRICS_ENABLED']:
+        g.metrics_started = time.perf_counter()
+        g.metrics_query_count = 0
+        g.metrics_db_seconds = 0.0
+
+@app.after_request
+def finish_request_metrics(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    
+    seconds = time.perf_counter() - started
+    # Marshrut shabloni (/room/<int:room_id>) - URL bo'yicha emas, aks holda yorliqlar cheksiz ko'payadi
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    request_metrics.record(route, request.method, response.status_code, seconds,
+                           g.metrics_query_count, g.metrics_db_seconds)
+    response.headers.add('Server-Timing', (
+        f'app;dur={seconds * 1000:.1f}, '
+        f'db;dur={g.metrics_db_seconds * 1000:.1f};desc="{g.metrics_query_count} queries"'
+    ))
+    return response
+
+with app.app_context():
+    @event.listens_for(db.engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics_started' in g:
+            conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(db.engine, 'after_cursor_execute')
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_query_started')
+        if started and has_request_context() and 'metrics_started' in g:
+            g.metrics_db_seconds += time.perf_counter() - started.pop()
+            g.metrics_query_count += 1
+
+# Prometheus uchun metrikalar
+@app.route('/metrics')
+def metrics():
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Metrikalar o\'chirilgan (INVENTORY_METRICS=1 bilan yoqing)'}), 404
+    return request_metrics.render() + hierarchy_cache.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+def hot_queries():
+    """Sahifalar va API lar bajaradigan asosiy so'rovlar (EXPLAIN QUERY PLAN tekshiruvi uchun).
+    So'rovlar marshrutlar ishlatadigan o'sha funksiyalar bilan quriladi; id qiymatlari
+    ahamiyatsiz - reja faqat so'rov shakliga bog'liq."""
+    transfers, delete_transfers = equipment_transfers_deletion(1)
+    queries = {
+        'organization_floors': organization_floors_query(1),
+        'organization_direct_rooms': organization_direct_rooms_query(1),
+        'floor_rooms': floor_rooms_query(1),
+        'organization_room_choices': organization_room_choices_query(1),
+        'floor_room_choices': floor_room_choices_query(1),
+        'room_equipment_count': db.select(db.func.count()).select_from(room_equipment_query(1).subquery()),
+        'room_equipment_page': equipment_page_query(room_equipment_query(1), 'name', False, ('a', 1)).limit(51),
+        'room_equipment_by_status': equipment_page_query(
+            room_equipment_query(1, status='Active'), 'created_at', True).limit(51),
+        'room_equipment_search': equipment_page_query(
+            room_equipment_query(1, search='a', category='IT'), 'inv_code', False).limit(51),
+        'room_qr_equipment': room_qr_query(1),
+        'floor_qr_equipment': floor_qr_query(1),
+        'organization_qr_equipment': organization_qr_query(1),
+        'lookup_inv_code': inv_code_lookup_query(['A-0001']),
+        'lookup_serial_number': serial_number_lookup_query(['SN1']),
+        'transfer_history': transfer_history_query(1),
+        'hierarchy_rooms': hierarchy_rooms_query([1, 2]),
+        'summary_room_parents': room_parents_query([1, 2]),
+        'report_summary': report_summary_query(1),
+        'report_summary_all': report_summary_query(),
+        'report_breakdown': report_breakdown_query(1),
+        'report_breakdown_all': report_breakdown_query(),
+        'export_organization_floor_ids': organization_floor_ids_query(1),
+        'export_organization_with_floors': organization_export_query(1, True),
+        'export_organization_without_floors': organization_export_query(1, False),
+        'export_room': room_export_query(1),
+        'delete_equipment_transfer_months': transfer_month_totals(transfers),
+        'delete_equipment_transfers': delete_transfers,
+    }
+    for number, statement in enumerate(touch_rooms_statements([1, 2]), 1):
+        queries[f'touch_rooms_{number}'] = statement
+    
+    # delete_rooms_where: tashkilot, qavat va xona bo'yicha
+    for name, criteria in (('organization', Room.organization_id == 1), ('floor', Room.floor_id == 1), ('room', Room.id == 1)):
+        room_ids, transfers, statements = rooms_deletion(criteria)
+        queries[f'delete_{name}_summary_totals'] = room_summary_totals(room_ids)
+        queries[f'delete_{name}_summary_rows'] = room_summary_delete(room_ids)
+        queries[f'delete_{name}_breakdown_totals'] = room_breakdown_totals(room_ids)
+        queries[f'delete_{name}_transfer_months'] = transfer_month_totals(transfers)
+        for number, statement in enumerate(statements, 1):
+            queries[f'delete_{name}_rooms_{number}'] = statement
+    for number, statement in enumerate(organization_deletion(1), 1):
+        queries[f'delete_organization_{number}'] = statement
+    for number, statement in enumerate(floor_deletion(1), 1):
+        queries[f'delete_floor_{number}'] = statement
+    
+    # ORM Query -> SELECT
+    return {name: getattr(query, 'statement', query) for name, query in queries.items()}
+
+def explain_query_plan(statement):
+    """So'rov rejasi qatorlari (SQLite EXPLAIN QUERY PLAN ning detail ustuni)"""
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    result = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}')
+    return [row[3] for row in result]
+
+def full_scans(plan):
+    """Jadvalni to'liq o'qiydigan qadamlar (FTS virtual jadvallari bundan mustasno)"""
+    return [step for step in plan if step.startswith('SCAN ') and 'VIRTUAL TABLE' not in step]
+
+# So'rov rejalarini tekshirish: flask --app app check-query-plans
+@app.cli.command('check-query-plans')
+def check_query_plans():
+    """Asosiy so'rovlardan birortasi indekssiz (SCAN) bajarilsa, xato bilan tugaydi"""
+    failed = []
+    for name, statement in hot_queries().items():
+        plan = explain_query_plan(statement)
+        scans = full_scans(plan)
+        print(f"{'XATO' if scans else 'OK  '} {name}")
+        for step in plan:
+            print(f"       {step}")
+        if scans:
+            failed.append(name)
+    
+    if failed:
+        print(f"\nIndekssiz so'rovlar: {', '.join(failed)}")
+        raise SystemExit(1)
+    print("\nBarcha so'rovlar indeks orqali bajariladi")
+
+# Yig'ma jadvallarni qayta qurish: flask --app app rebuild-summary
+@app.cli.command('rebuild-summary')
+def rebuild_summary():
+    """Jihozlar sonini (tashkilot/qavat/xona, brend, oy) va oylik transferlarni asl jadvallardan qayta hisoblash"""
+    rebuild_inventory_summary()
+    db.session.commit()
+    groups = InventorySummary.query.count() + InventoryBreakdown.query.count()
+    print(f"Yig'ma jadvallar qayta qurildi: {groups} ta guruh")
+
+# Yig'ma jadvallarni tekshirish: flask --app app check-summary
+@app.cli.command('check-summary')
+def check_summary():
+    """Yig'ma jadvallar asl jadvallarga mos kelmasa, farqlarni chiqarib xato bilan tugaydi"""
+    differences = inventory_summary_differences()
+    for key, expected, stored in differences:
+        print(f"XATO {' '.join(map(repr, key))}: kutilgan {expected}, saqlangan {stored}")
+    
+    if differences:
+        print(f"\n{len(differences)} ta guruh mos emas - flask --app app rebuild-summary bilan tuzating")
+        raise SystemExit(1)
+    print("Yig'ma jadvallar asl jadvallarga mos")
+
+# Ilova qanday ishga tushirilishidan qat'i nazar (app.py yoki launcher) jadvallar tayyor bo'lishi kerak.
+# QR ishchi jarayonlari (spawn rejimida modulni qayta yuklaganda) bazaga tegmasligi kerak.
+if multiprocessing.parent_process() is None:
     with app.app_context():
-        db.create_all()
+        init_db()
+
+if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Sinov ma'lumotlari generatori: tashkilotlar, qavatlar, xonalar, jihozlar va transferlar
+
+Ma'lumotlar app.py modellari orqali (SQLAlchemy Core executemany bilan) yoziladi,
+bir xil --seed bilan har doim bir xil baza hosil bo'ladi. Inventarizatsiya kodlari
+ilova formatida (TASHKILOT-XONA-RAQAM) va InvCodeSequence bilan mos holda yaratiladi.
+
+Ishga tushirish:
+    python benchmarks/generate_data.py --database /tmp/bench.db \\
+        --organizations 100 --rooms 50000 --equipment 5000000 --transfers 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ORGANIZATION_NAMES = [
+    'Toshkent', 'Samarqand', 'Buxoro', 'Andijon', 'Namangan', "Farg'ona", 'Qarshi', 'Termiz',
+    'Navoiy', 'Jizzax', 'Guliston', 'Urganch', 'Nukus', 'Xiva', 'Marg\'ilon', 'Chirchiq'
+]
+ORGANIZATION_KINDS = ['universiteti', 'kasalxonasi', 'maktabi', 'hokimligi', 'kolleji', 'banki']
+CATEGORIES = ['Kompyuter', 'Printer', 'Monitor', 'Stol', 'Stul', 'Shkaf', 'Proyektor', 'Konditsioner', 'Telefon']
+BRANDS = ['HP', 'Lenovo', 'Dell', 'Canon', 'Samsung', 'LG', 'Epson', 'Asus', 'Artel', 'Ikea', None]
+COLORS = ['Qora', 'Oq', 'Kulrang', 'Jigarrang', 'Ko\'k', None]
+STATUSES = ['Active'] * 8 + ['Repair', 'Inactive']
+
+BATCH_SIZE = 10000
+
+def load_app(database):
+    """app.py ni berilgan baza bilan yuklash (haqiqiy inventory.db ga tegmaslik uchun)"""
+    os.environ['INVENTORY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(database)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import app
+    return app
+
+def next_id(db, model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+def insert_batches(db, table, rows):
+    """Qatorlarni BATCH_SIZE lik bo'laklarda executemany bilan yozish"""
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        count += len(batch)
+    return count
+
+def populate(organizations, floors_per_organization, rooms, equipment, transfers,
+             floor_ratio=0.7, seed=42, log=print):
+    """Joriy ilova bazasini sinov ma'lumotlari bilan to'ldirish (app kontekst ichida chaqiriladi)
+
+    Xonalar tashkilotlar orasida, jihozlar xonalar orasida teng taqsimlanadi;
+    bitta xonaning jihozlari ketma-ket id larga ega (Excel importdagi kabi).
+    Natija: yaratilgan tashkilotlar id lari.
+    """
+    from collections import Counter
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+    from app import (db, Organization, Floor, Room, Equipment, TransferHistory, InvCodeSequence,
+                     inv_code_prefix, init_search_index, apply_summary_deltas, apply_breakdown_deltas)
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    rooms = max(rooms, organizations)
+
+    # Tashkilotlar va qavatlar
+    first_org_id = next_id(db, Organization)
+    org_rows = []
+    for n in range(organizations):
+        name = f"{rng.choice(ORGANIZATION_NAMES)} {rng.choice(ORGANIZATION_KINDS)} {first_org_id + n}"
+        org_rows.append({
+            'id': first_org_id + n, 'name': name,
+            'has_floors': rng.random() < floor_ratio, 'created_at': now
+        })
+    insert_batches(db, Organization.__table__, org_rows)
+
+    floor_id = next_id(db, Floor)
+    org_floors = {}
+    floor_rows = []
+    for org in org_rows:
+        if not org['has_floors']:
+            continue
+        org_floors[org['id']] = []
+        for number in range(1, floors_per_organization + 1):
+            floor_rows.append({'id': floor_id, 'name': f'{number}-qavat', 'organization_id': org['id'], 'created_at': now})
+            org_floors[org['id']].append((floor_id, number))
+            floor_id += 1
+    insert_batches(db, Floor.__table__, floor_rows)
+
+    # Xonalar: tashkilotlar orasida teng, qavatli tashkilotda qavatlar bo'yicha navbat bilan
+    first_room_id = next_id(db, Room)
+    room_info = []  # (room_id, tashkilot, xona nomi)
+    room_rows = []
+    for index in range(rooms):
+        org = org_rows[index * organizations // rooms]
+        local_index = index - (org['id'] - first_org_id) * rooms // organizations
+        room_id = first_room_id + index
+        if org['has_floors']:
+            floor, number = org_floors[org['id']][local_index % floors_per_organization]
+            name = f"{number}{local_index // floors_per_organization + 1:02d}"
+        else:
+            floor, name = None, f"{local_index + 1}-xona"
+        room_rows.append({'id': room_id, 'name': name, 'organization_id': org['id'], 'floor_id': floor, 'created_at': now})
+        room_info.append((room_id, org, name))
+    insert_batches(db, Room.__table__, room_rows)
+    db.session.commit()
+    log(f"  {organizations} tashkilot, {len(floor_rows)} qavat, {rooms} xona")
+
+    # Jihozlar: FTS triggerlari o'chirilib, oxirida indeks bir marta qayta quriladi
+    for trigger in ('equipment_fts_insert', 'equipment_fts_update', 'equipment_fts_delete'):
+        db.session.execute(db.text(f'DROP TRIGGER IF EXISTS {trigger}'))
+
+    counters = {}
+    for sequence in InvCodeSequence.query.all():
+        counters[sequence.prefix] = sequence.last_value
+    prefixes = [inv_code_prefix(org['name'], name) for _, org, name in room_info]
+    # Ketma-ketligi hali yo'q prefikslar uchun mavjud kodlardan boshlash (allocate_inv_codes kabi)
+    for prefix in set(prefixes) - set(counters):
+        counters[prefix] = 0
+        for (code,) in db.session.query(Equipment.inv_code).filter(Equipment.inv_code.like(f'{prefix}-%')):
+            suffix = code[len(prefix) + 1:]
+            if suffix.isdigit():
+                counters[prefix] = max(counters[prefix], int(suffix))
+
+    first_equipment_id = next_id(db, Equipment)
+    started = time.perf_counter()
+    # Yig'ma jadvallar uchun: (tashkilot, qavat, xona, kategoriya, holat) va (kesim, tashkilot, qiymat) -> soni
+    summary = Counter()
+    breakdown = Counter()
+
+    def equipment_rows():
+        for index in range(equipment):
+            room_index = index * rooms // equipment
+            prefix = prefixes[room_index]
+            counters[prefix] += 1
+            category = rng.choice(CATEGORIES)
+            brand = rng.choice(BRANDS)
+            status = rng.choice(STATUSES)
+            room = room_rows[room_index]
+            created_at = now - timedelta(minutes=equipment - index)
+            summary[room['organization_id'], room['floor_id'], room['id'], category, status] += 1
+            breakdown['brand', room['organization_id'], brand] += 1
+            breakdown['month', room['organization_id'], created_at.strftime('%Y-%m')] += 1
+            yield {
+                'id': first_equipment_id + index,
+                'inv_code': f"{prefix}-{counters[prefix]:04d}",
+                'name': f"{category} {brand or ''}".strip(),
+                'category': category,
+                'brand': brand,
+                'model': f"M-{rng.randrange(1000):03d}" if brand else None,
+                'serial_number': f"SN{rng.randrange(10 ** 9):09d}",
+                'color': rng.choice(COLORS),
+                'status': status,
+                'description': None,
+                'room_id': room_info[room_index][0],
+                'created_at': created_at
+            }
+            if index and index % 500000 == 0:
+                log(f"  {index} jihoz ({time.perf_counter() - started:.0f} s)")
+
+    insert_batches(db, Equipment.__table__, equipment_rows())
+    upsert = sqlite_insert(InvCodeSequence)
+    db.session.execute(
+        upsert.on_conflict_do_update(index_elements=['prefix'], set_={'last_value': upsert.excluded.last_value}),
+        [{'prefix': prefix, 'last_value': last_value} for prefix, last_value in counters.items()]
+    )
+    apply_summary_deltas(summary)
+    apply_breakdown_deltas(breakdown)
+    db.session.commit()
+    log(f"  {equipment} jihoz ({time.perf_counter() - started:.0f} s)")
+
+    db.session.execute(db.text("INSERT INTO equipment_fts(equipment_fts) VALUES ('rebuild')"))
+    init_search_index()
+    log("  qidiruv indeksi qayta qurildi")
+
+    # Transferlar: jihozning hozirgi xonasiga shu tashkilotdagi boshqa xonadan
+    def transfer_rows():
+        for _ in range(transfers if equipment else 0):
+            index = rng.randrange(equipment)
+            room_index = index * rooms // equipment
+            room_id, org, _ = room_info[room_index]
+            org_first = (org['id'] - first_org_id) * rooms // organizations
+            org_last = (org['id'] - first_org_id + 1) * rooms // organizations - 1
+            from_room_id = first_room_id + rng.randint(org_first, org_last)
+            old_inv_code = f"OLD-{rng.randrange(10 ** 6):06d}"
+            new_inv_code = f"NEW-{rng.randrange(10 ** 6):06d}"
+            transfer_date = now - timedelta(days=rng.randrange(365))
+            transfer_months['transfer_month', org['id'], transfer_date.strftime('%Y-%m')] += 1
+            yield {
+                'equipment_id': first_equipment_id + index,
+                'from_room_id': from_room_id,
+                'to_room_id': room_id,
+                'old_inv_code': old_inv_code,
+                'new_inv_code': new_inv_code,
+                'transfer_date': transfer_date,
+                'notes': None
+            }
+
+    transfer_months = Counter()
+    insert_batches(db, TransferHistory.__table__, transfer_rows())
+    apply_breakdown_deltas(transfer_months)
+    db.session.commit()
+    log(f"  {transfers} transfer")
+
+    return [org['id'] for org in org_rows]
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinov ma'lumotlari bilan bazani to'ldirish")
+    parser.add_argument('--database', required=True, help="SQLite fayl (yo'q bo'lsa yaratiladi, bor bo'lsa qo'shiladi)")
+    parser.add_argument('--organizations', type=int, default=10)
+    parser.add_argument('--floors', type=int, default=5, help="Qavatli tashkilotdagi qavatlar soni")
+    parser.add_argument('--floor-ratio', type=float, default=0.7, help="Qavatli tashkilotlar ulushi")
+    parser.add_argument('--rooms', type=int, default=500, help="Jami xonalar soni")
+    parser.add_argument('--equipment', type=int, default=50000, help="Jami jihozlar soni")
+    parser.add_argument('--transfers', type=int, default=5000, help="Transfer tarixi yozuvlari soni")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app_module = load_app(args.database)
+    started = time.perf_counter()
+    print(f"Baza: {os.path.abspath(args.database)}")
+    with app_module.app.app_context():
+        populate(args.organizations, args.floors, args.rooms, args.equipment, args.transfers,
+                 floor_ratio=args.floor_ratio, seed=args.seed)
+        app_module.db.session.execute(app_module.db.text('ANALYZE'))
+        app_module.db.session.commit()
+    print(f"Tayyor: {time.perf_counter() - started:.1f} s")
+
+if __name__ == '__main__':
+    main()
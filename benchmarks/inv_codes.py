@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Inventarizatsiya kodlari ketma-ketligi Excel dagi (tashqaridan berilgan) kodlar bilan to'qnashmasligini tekshirish
+
+Vaqtinchalik bazada:
+  1. jihoz qo'shiladi (GAM-LAB-0001), keyin Excel dan GAM-LAB-0002 kodi import qilinadi;
+     keyingi jihoz qo'shish, transfer va guruhli transfer yangi (takrorlanmagan) kod olishi kerak
+  2. Excel da kodsiz qatorlar va keyingi bo'lakdagi shu prefiksli kod - hammasi import qilinishi kerak
+  3. ketma-ketlikdan tashqari (to'g'ridan-to'g'ri bazaga) yozilgan kod - ajratuvchi uni o'tkazib yuborishi kerak
+Birortasi bajarilmasa, skript 1 kodi bilan tugaydi.
+
+Ishga tushirish:
+    python benchmarks/inv_codes.py
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+from generate_data import load_app
+
+def excel_file(app_module, rows):
+    """[(nomi, kodi)] qatorlaridan import uchun .xlsx fayl"""
+    from openpyxl import Workbook
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(app_module.IMPORT_COLUMNS))
+    for name, code in rows:
+        sheet.append([name, 'Dell', 'X', None, None, code, 1, None, 'Ali'])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+def run_import(client, organization_id, room_id, rows, app_module):
+    response = client.post(f'/import_excel/{organization_id}', content_type='multipart/form-data',
+                           data={'room_id': str(room_id), 'file': (excel_file(app_module, rows), 'kodlar.xlsx')})
+    job_id = response.json['job_id']
+    while True:
+        job = client.get(f'/jobs/{job_id}').json
+        if job['finished']:
+            return job
+        time.sleep(0.1)
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix='inv-codes-')
+    app_module = load_app(os.path.join(work_dir, 'codes.db'))
+    app_module.app.config['IMPORT_CHUNK_SIZE'] = 2
+    client = app_module.app.test_client()
+    failed = []
+
+    def check(name, ok, detail=''):
+        print(f"{name:<44} {'OK' if ok else 'XATO'}  {detail}")
+        if not ok:
+            failed.append(name)
+
+    def add_equipment(organization_id, room_id, name):
+        response = client.post('/add_equipment', json={'name': name, 'category': 'IT',
+                                                       'organization_id': organization_id, 'room_id': room_id})
+        equipment = app_module.Equipment.query.filter_by(name=name).first() if response.status_code == 200 else None
+        return response.status_code, equipment
+
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        organization_id = client.post('/add_organization', json={'name': 'Gamma'}).json['organization_id']
+        lab_id = client.post('/add_room', json={'name': 'Lab', 'organization_id': organization_id}).json['room_id']
+        store_id = client.post('/add_room', json={'name': 'Ombor', 'organization_id': organization_id}).json['room_id']
+
+        # 1. Ajratilgan kod, keyin Excel dagi keyingi kod
+        add_equipment(organization_id, lab_id, 'birinchi')
+        job = run_import(client, organization_id, lab_id, [('excel', 'GAM-LAB-0002')], app_module)
+        check('excel kodi import qilindi', job['imported_count'] == 1, job['message'])
+        status, equipment = add_equipment(organization_id, lab_id, 'ikkinchi')
+        check('excel kodidan keyin jihoz qo\'shish', status == 200, equipment.inv_code if equipment else status)
+
+        job = run_import(client, organization_id, store_id, [('ombor', 'GAM-LAB-0004')], app_module)
+        moved = app_module.Equipment.query.filter_by(name='ombor').first()
+        response = client.post(f'/transfer_equipment/{moved.id}', json={'room_id': lab_id})
+        check('excel kodidan keyin transfer', response.status_code == 200, response.json.get('new_inv_code', ''))
+
+        run_import(client, organization_id, store_id, [('guruh', 'GAM-LAB-0007'), ('guruh2', 'GAM-LAB-0008')], app_module)
+        group = [equipment.id for equipment in app_module.Equipment.query.filter(
+            app_module.Equipment.name.in_(['guruh', 'guruh2']))]
+        response = client.post('/transfer_equipment/bulk', json={'equipment_ids': group, 'room_id': lab_id})
+        check('excel kodidan keyin guruhli transfer', response.status_code == 200, response.json.get('message', ''))
+
+        # 2. Kodsiz qatorlar va keyingi bo'lakdagi shu prefiksli kod (bo'lak - 2 qator)
+        last = app_module.db.session.get(app_module.InvCodeSequence, 'GAM-LAB').last_value
+        rows = [('kodsiz1', None), ('kodsiz2', None), ('kodli', f'GAM-LAB-{last + 2:04d}'), ('kodsiz3', None)]
+        job = run_import(client, organization_id, lab_id, rows, app_module)
+        check('bir importda kodsiz va kodli qatorlar', job['imported_count'] == 4 and job['error_count'] == 0,
+              f"{job['imported_count']} ta, {job['error_count']} xato")
+
+        # 3. Ketma-ketlikdan tashqari yozilgan kod
+        last = app_module.db.session.get(app_module.InvCodeSequence, 'GAM-LAB').last_value
+        outside = app_module.Equipment(inv_code=f'GAM-LAB-{last + 1:04d}', name='tashqi', category='IT', room_id=lab_id)
+        app_module.db.session.add(outside)
+        app_module.db.session.commit()
+        status, equipment = add_equipment(organization_id, lab_id, 'uchinchi')
+        check('tashqi koddan keyin jihoz qo\'shish', status == 200, equipment.inv_code if equipment else status)
+
+        codes = [code for (code,) in app_module.db.session.query(app_module.Equipment.inv_code)]
+        check('barcha kodlar takrorlanmas', len(codes) == len(set(codes)), f"{len(codes)} ta kod")
+
+    if failed:
+        print(f"\nInventarizatsiya kodlari to'qnashdi: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nInventarizatsiya kodlari to'qnashmaydi")
+
+if __name__ == '__main__':
+    main()
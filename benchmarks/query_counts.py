@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Sahifalar va Excel eksportdagi SQL so'rovlar soni ma'lumotlar hajmiga bog'liq emasligini tekshirish (N+1)
+
+Vaqtinchalik bazada kichik va katta tashkilotlar yaratiladi; har bir sahifa va eksport
+ikkalasi uchun ochilib, bajarilgan SQL so'rovlar soni solishtiriladi. Soni
+farq qilsa (ya'ni xona/jihoz soniga qarab o'sadi), skript 1 kodi bilan tugaydi.
+
+Ishga tushirish:
+    python benchmarks/query_counts.py
+"""
+
+import os
+import sys
+import tempfile
+
+from sqlalchemy import event
+
+from generate_data import load_app, populate
+
+# Bitta tashkilot uchun: qavatlar, xonalar va jihozlar soni
+SIZES = {'kichik': (1, 2, 10), 'katta': (5, 40, 2000)}
+
+def page_urls(app_module, floors_org_id, direct_org_id):
+    """Tekshiriladigan sahifalar va eksportlar (berilgan tashkilotlar ma'lumotlari bilan)"""
+    floor = app_module.Floor.query.filter_by(organization_id=floors_org_id).first()
+    room = app_module.Room.query.filter_by(organization_id=direct_org_id).first()
+    return {
+        'index': '/',
+        'organization_with_floors': f'/organization/{floors_org_id}',
+        'organization_direct_rooms': f'/organization/{direct_org_id}',
+        'floor_page': f'/floor/{floor.id}',
+        'room_page': f'/room/{room.id}',
+        'room_equipment': f'/room/{room.id}/equipment',
+        'get_rooms': f'/get_rooms/{floors_org_id}',
+        'get_rooms_by_floor': f'/get_rooms_by_floor/{floor.id}',
+        'export_excel_with_floors': f'/export_excel/{floors_org_id}',
+        'export_excel_direct_rooms': f'/export_excel/{direct_org_id}',
+        'export_room_excel': f'/export_room_excel/{room.id}',
+    }
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix='inv-queries-')
+    app_module = load_app(os.path.join(work_dir, 'queries.db'))
+    client = app_module.app.test_client()
+
+    statements = []
+    with app_module.app.app_context():
+        event.listen(app_module.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        results = {}
+        for size, (floors, rooms, equipment) in SIZES.items():
+            floors_org_id = populate(1, floors, rooms, equipment, equipment // 10, floor_ratio=1, log=lambda _: None)[0]
+            direct_org_id = populate(1, floors, rooms, equipment, equipment // 10, floor_ratio=0, log=lambda _: None)[0]
+            for name, url in page_urls(app_module, floors_org_id, direct_org_id).items():
+                app_module.db.session.remove()
+                statements.clear()
+                response = client.get(url)
+                if response.status_code != 200:
+                    sys.exit(f"{url}: {response.status_code}")
+                results.setdefault(name, {})[size] = len(statements)
+
+    failed = []
+    print(f"{'sahifa':<28} " + ' '.join(f'{size:>7}' for size in SIZES))
+    for name, counts in results.items():
+        status = 'OK' if len(set(counts.values())) == 1 else 'XATO'
+        if status != 'OK':
+            failed.append(name)
+        print(f"{name:<28} " + ' '.join(f'{counts[size]:>7}' for size in SIZES) + f"  {status}")
+
+    if failed:
+        print(f"\nSo'rovlar soni ma'lumotlar hajmiga bog'liq: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nBarcha sahifalar va eksportlarda so'rovlar soni o'zgarmas")
+
+if __name__ == '__main__':
+    main()
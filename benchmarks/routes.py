@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Asosiy marshrutlar benchmarki: p50/p95 vaqt va xotira, natija JSON faylga
+
+Baza (generate_data.py bilan yaratilgan) vaqtinchalik nusxaga ko'chiriladi -
+import, transfer va o'chirish benchmarklari asl faylni o'zgartirmaydi.
+So'rovlar Flask test client orqali (tarmoqsiz) jarayon ichida bajariladi.
+
+Ishga tushirish:
+    python benchmarks/generate_data.py --database /tmp/bench.db
+    python benchmarks/routes.py --database /tmp/bench.db --output results.json
+    python benchmarks/routes.py --database /tmp/bench.db --compare results.json
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from generate_data import ROOT, load_app, populate
+
+ROUTES = ['index', 'room_page', 'reports', 'generate_room_qr_codes', 'export_excel',
+          'import_excel', 'transfer_equipment', 'delete_organization']
+# Og'ir marshrutlar kamroq takrorlanadi
+HEAVY_ROUTES = {'export_excel', 'import_excel', 'delete_organization'}
+
+def percentile(values, fraction):
+    """Eng yaqin rang usulidagi persentil"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+def current_rss_mb():
+    """Joriy RSS (Linux da /proc orqali, boshqa tizimlarda eng yuqori RSS)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except OSError:
+        return max_rss_mb()
+
+def max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+def copy_database(source, target):
+    """WAL rejimidagi bazani ham to'liq nusxalash (SQLite backup API)"""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def import_workbook(rows):
+    """Import benchmarki uchun Excel fayl (upload_excel sahifasidagi shablon ustunlari)"""
+    from openpyxl import Workbook
+    from app import IMPORT_COLUMNS
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(IMPORT_COLUMNS))
+    for n in range(rows):
+        ws.append([f'Noutbuk {n}', 'Lenovo', 'T14', f'BENCH-SN-{n}', 'Qora', None, '1 dona', 'Active', 'Xodim'])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+class RouteBenchmarks:
+    """Har bir marshrut uchun: prepare() -> so'rov (vaqt o'lchanadi)"""
+
+    def __init__(self, app_module, rng, args):
+        self.app = app_module
+        self.client = app_module.app.test_client()
+        self.rng = rng
+        self.args = args
+        db = app_module.db
+        self.organization_ids = [row[0] for row in db.session.query(app_module.Organization.id)]
+        self.room_ids = [row[0] for row in db.session.query(app_module.Equipment.room_id).distinct()]
+        self.max_equipment_id = db.session.query(db.func.max(app_module.Equipment.id)).scalar()
+        if not self.room_ids:
+            raise SystemExit("Bazada jihozlar yo'q - avval generate_data.py ni ishga tushiring")
+        self.import_file = None
+
+    def request(self, method, url, expected=(200,), **kwargs):
+        response = self.client.open(url, method=method, **kwargs)
+        response.get_data()  # send_file javoblarini ham oxirigacha o'qish
+        if response.status_code not in expected:
+            raise RuntimeError(f"{method} {url}: {response.status_code} {response.get_data(as_text=True)[:200]}")
+        return response
+
+    def index(self):
+        self.request('GET', '/')
+
+    def room_page(self):
+        self.request('GET', f'/room/{self.rng.choice(self.room_ids)}')
+
+    def reports(self):
+        # Navbat bilan: barcha tashkilotlar va tasodifiy tashkilot bo'yicha hisobot
+        organization_id = self.rng.choice([None, self.rng.choice(self.organization_ids)])
+        self.request('GET', f"/reports/data?organization_id={organization_id or ''}&months=24")
+
+    def generate_room_qr_codes(self):
+        self.request('GET', f'/generate_room_qr_codes/{self.rng.choice(self.room_ids)}')
+
+    def export_excel(self):
+        self.request('GET', f'/export_excel/{self.rng.choice(self.organization_ids)}')
+
+    def import_excel(self):
+        if self.import_file is None:
+            self.import_file = import_workbook(self.args.import_rows)
+        room = self.app.Room.query.get(self.rng.choice(self.room_ids))
+        response = self.request('POST', f'/import_excel/{room.organization_id}', expected=(202,), data={
+            'room_id': str(room.id),
+            'file': (io.BytesIO(self.import_file), 'benchmark.xlsx')
+        })
+        # Import fon rejimida - vazifa tugaguncha kutish ham o'lchovga kiradi
+        job_url = f"/jobs/{response.get_json()['job_id']}"
+        while True:
+            job = self.request('GET', job_url).get_json()
+            if job['finished']:
+                if job['status'] != 'done':
+                    raise RuntimeError(f"Import xatoligi: {job['message']}")
+                return
+            time.sleep(0.01)
+
+    def transfer_equipment(self):
+        equipment = None
+        while equipment is None:
+            equipment = self.app.db.session.get(self.app.Equipment, self.rng.randint(1, self.max_equipment_id))
+        target = self.rng.choice([room_id for room_id in self.rng.sample(self.room_ids, min(2, len(self.room_ids)))
+                                  if room_id != equipment.room_id] or self.room_ids)
+        self.app.db.session.rollback()
+        self.request('POST', f'/transfer_equipment/{equipment.id}', json={'room_id': target, 'notes': 'benchmark'})
+
+    def prepare_delete_organization(self):
+        organization_ids = populate(1, 5, self.args.delete_rooms, self.args.delete_equipment,
+                                    self.args.delete_equipment // 10, seed=self.rng.randrange(10 ** 6), log=lambda _: None)
+        return organization_ids[0]
+
+    def delete_organization(self, organization_id):
+        self.request('DELETE', f'/delete_organization/{organization_id}')
+
+def run_route(bench, name, iterations, warmup):
+    """Marshrutni takroriy o'lchash: vaqtlar (ms) va xotira"""
+    prepare = getattr(bench, f'prepare_{name}', None)
+    handler = getattr(bench, name)
+    timings = []
+    rss_before = current_rss_mb()
+    for iteration in range(warmup + iterations):
+        args = (prepare(),) if prepare else ()
+        bench.app.db.session.remove()
+        started = time.perf_counter()
+        handler(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+        bench.app.db.session.remove()
+        if iteration >= warmup:
+            timings.append(elapsed)
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'mean_ms': round(sum(timings) / len(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'rss_delta_mb': round(current_rss_mb() - rss_before, 1),
+        'max_rss_mb': round(max_rss_mb(), 1)
+    }
+
+def print_comparison(results, previous):
+    print(f"\nSolishtirish: {previous.get('commit')} -> {results.get('commit')}")
+    print(f"{'marshrut':<24} {'p50 oldin':>10} {'p50 hozir':>10} {'p95 oldin':>10} {'p95 hozir':>10} {'nisbat':>7}")
+    for name, current in results['routes'].items():
+        before = previous.get('routes', {}).get(name)
+        if not before:
+            continue
+        ratio = current['p50_ms'] / before['p50_ms'] if before['p50_ms'] else float('nan')
+        print(f"{name:<24} {before['p50_ms']:>10.1f} {current['p50_ms']:>10.1f} "
+              f"{before['p95_ms']:>10.1f} {current['p95_ms']:>10.1f} {ratio:>6.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Marshrutlar benchmarki (p50/p95, xotira, JSON)")
+    parser.add_argument('--database', required=True, help="generate_data.py bilan yaratilgan baza")
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, default=ROUTES)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--heavy-iterations', type=int, default=3, help="export/import/delete uchun")
+    parser.add_argument('--warmup', type=int, default=1, help="Hisobga olinmaydigan birinchi so'rovlar")
+    parser.add_argument('--import-rows', type=int, default=1000)
+    parser.add_argument('--delete-rooms', type=int, default=50, help="O'chiriladigan tashkilotdagi xonalar")
+    parser.add_argument('--delete-equipment', type=int, default=5000, help="O'chiriladigan tashkilotdagi jihozlar")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Natijalarni JSON faylga yozish")
+    parser.add_argument('--compare', help="Oldingi JSON natija bilan solishtirish")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='inv-routes-')
+    try:
+        database = os.path.join(work_dir, 'bench.db')
+        copy_database(args.database, database)
+        app_module = load_app(database)
+        app_module.app.config['QR_CACHE_DIR'] = os.path.join(work_dir, 'qr_cache')
+
+        results = {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'routes': {}
+        }
+        with app_module.app.app_context():
+            db = app_module.db
+            results['dataset'] = {
+                'organizations': db.session.query(app_module.Organization).count(),
+                'rooms': db.session.query(app_module.Room).count(),
+                'equipment': db.session.query(app_module.Equipment).count(),
+                'transfers': db.session.query(app_module.TransferHistory).count()
+            }
+            print(f"Baza: {results['dataset']}")
+            bench = RouteBenchmarks(app_module, random.Random(args.seed), args)
+            print(f"{'marshrut':<24} {'p50 ms':>9} {'p95 ms':>9} {'RSS +MB':>8} {'max RSS':>8}")
+            for name in args.routes:
+                iterations = args.heavy_iterations if name in HEAVY_ROUTES else args.iterations
+                stats = run_route(bench, name, iterations, args.warmup)
+                results['routes'][name] = stats
+                print(f"{name:<24} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                      f"{stats['rss_delta_mb']:>8.1f} {stats['max_rss_mb']:>8.1f}")
+            app_module.import_executor.shutdown(wait=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+        print(f"\nNatija: {args.output}")
+    if args.compare:
+        with open(args.compare) as previous:
+            print_comparison(results, json.load(previous))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+SQLite sozlamalari benchmarki: bir vaqtda o'qish va yozish o'tkazuvchanligi
+
+Bir xil ma'lumotlar bilan ikki vaqtinchalik baza solishtiriladi:
+  - default: SQLite standart sozlamalari (rollback journal)
+  - tuned:   app.config['SQLITE_PRAGMAS'] (WAL, synchronous=NORMAL, ...)
+
+Yuklama: bir nechta oqim xona sahifasidagi so'rovlarni bajaradi, bitta oqim
+jihoz qo'shadi (har biri alohida tranzaksiya), bitta oqim esa eksport kabi
+butun jadvalni sekin o'qiydi.
+
+Ishga tushirish:
+    python benchmarks/sqlite_concurrency.py --rows 50000 --seconds 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+WORK_DIR = tempfile.mkdtemp(prefix='inv-bench-')
+# app.py import qilinganda haqiqiy bazaga tegmasligi uchun
+os.environ['INVENTORY_DATABASE_URI'] = 'sqlite:///' + os.path.join(WORK_DIR, 'app.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, insert, select, func  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app import app, db, apply_sqlite_pragmas, Organization, Room, Equipment  # noqa: E402
+
+ROOMS = 50
+
+def create_database(name, pragmas, rows):
+    """Vaqtinchalik baza: jadvallar va sinov ma'lumotlari"""
+    engine = create_engine('sqlite:///' + os.path.join(WORK_DIR, f'{name}.db'),
+                           pool_size=10, max_overflow=20)
+    if pragmas:
+        event.listen(engine, 'connect', lambda connection, record: apply_sqlite_pragmas(connection, pragmas))
+
+    db.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(Organization.__table__), [{'id': 1, 'name': 'Benchmark', 'has_floors': False}])
+        connection.execute(insert(Room.__table__), [
+            {'id': room_id, 'name': f'{room_id}-xona', 'organization_id': 1} for room_id in range(1, ROOMS + 1)
+        ])
+        connection.execute(insert(Equipment.__table__), [{
+            'inv_code': f'BEN-{i:07d}', 'name': f'Jihoz {i}', 'category': 'Kompyuter',
+            'brand': 'Brand', 'serial_number': f'SN{i}', 'status': 'Active',
+            'room_id': i % ROOMS + 1, 'created_at': now
+        } for i in range(rows)])
+    return engine
+
+def run_workload(engine, seconds, readers):
+    """Belgilangan vaqt davomida yuklama: natija - amallar soni va xatolar"""
+    stop = threading.Event()
+    stats = {'reads': 0, 'writes': 0, 'write_errors': 0, 'read_errors': 0, 'scans': 0}
+    lock = threading.Lock()
+
+    def count(key):
+        with lock:
+            stats[key] += 1
+
+    def reader(worker_id):
+        room_id = worker_id % ROOMS + 1
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(
+                        select(Equipment.__table__).where(Equipment.room_id == room_id)
+                        .order_by(Equipment.name, Equipment.id).limit(50)
+                    ).all()
+                    connection.execute(
+                        select(func.count()).select_from(Equipment.__table__).where(Equipment.room_id == room_id)
+                    ).scalar()
+                count('reads')
+            except OperationalError:
+                count('read_errors')
+            room_id = room_id % ROOMS + 1
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(Equipment.__table__), {
+                        'inv_code': f'NEW-{threading.get_ident()}-{i}', 'name': 'Yangi jihoz',
+                        'category': 'Kompyuter', 'status': 'Active', 'room_id': i % ROOMS + 1,
+                        'created_at': datetime.utcnow()
+                    })
+                count('writes')
+            except OperationalError:
+                count('write_errors')
+            i += 1
+
+    def exporter():
+        # Eksport: uzoq davom etadigan o'qish tranzaksiyasi
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    result = connection.execute(select(Equipment.__table__).order_by(Equipment.room_id, Equipment.id))
+                    for n, _ in enumerate(result):
+                        if n % 5000 == 0:
+                            time.sleep(0.01)
+                        if stop.is_set():
+                            break
+                count('scans')
+            except OperationalError:
+                count('read_errors')
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads += [threading.Thread(target=writer), threading.Thread(target=exporter)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite default va tuned sozlamalarini solishtirish')
+    parser.add_argument('--rows', type=int, default=50000, help='Jihozlar soni')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Har bir rejim uchun yuklama davomiyligi')
+    parser.add_argument('--readers', type=int, default=4, help="O'quvchi oqimlar soni")
+    args = parser.parse_args()
+
+    print(f"Baza: {args.rows} jihoz, {args.readers} o'quvchi + 1 yozuvchi + 1 eksport, {args.seconds} s")
+    print(f"{'rejim':<8} {'o`qish/s':>10} {'yozish/s':>10} {'eksport':>8} {'yozish xato':>12} {'o`qish xato':>12}")
+    for name, pragmas in [('default', {}), ('tuned', app.config['SQLITE_PRAGMAS'])]:
+        engine = create_database(name, pragmas, args.rows)
+        stats = run_workload(engine, args.seconds, args.readers)
+        engine.dispose()
+        print(f"{name:<8} {stats['reads'] / args.seconds:>10.0f} {stats['writes'] / args.seconds:>10.0f} "
+              f"{stats['scans']:>8} {stats['write_errors']:>12} {stats['read_errors']:>12}")
+
+if __name__ == '__main__':
+    main()
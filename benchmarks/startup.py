@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+app.py ni ishga tushirish benchmarki: import vaqti, xotira va og'ir kutubxonalar
+
+Har bir o'lchov alohida (toza) Python jarayonida bajariladi:
+  - `import app` vaqti va undan keyingi RSS (ru_maxrss)
+  - `python -X importtime` bo'yicha eng sekin yuklanadigan modullar
+  - pandas / openpyxl / qrcode / PIL / numpy import paytida yuklanmaganligi
+
+Og'ir kutubxona import paytida yuklansa yoki berilgan chegaralardan oshsa,
+skript 1 kodi bilan tugaydi (regressiyani aniqlash uchun).
+
+Ishga tushirish:
+    python benchmarks/startup.py --runs 5 --max-ms 1500 --max-rss-mb 80
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Faqat import/eksport/QR funksiyalarida kerak bo'ladigan kutubxonalar
+LAZY_MODULES = ['pandas', 'numpy', 'openpyxl', 'qrcode', 'PIL']
+
+PROBE = f"""
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss //= 1024
+print(json.dumps({{
+    'import_ms': elapsed * 1000,
+    'rss_mb': rss / 1024,
+    'loaded': [name for name in {LAZY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+def run_probe(env, importtime=False):
+    """Toza jarayonda `import app` ni o'lchash"""
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', PROBE]
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def slowest_imports(importtime_output, top):
+    """-X importtime natijasidan yuqori darajadagi eng sekin modullar (kumulyativ, ms)"""
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Yuqori daraja: app.py ning o'zi bevosita import qilgan modullar
+        if name.startswith('  ') and not name.startswith('    '):
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="app.py import vaqti va xotirasini o'lchash")
+    parser.add_argument('--runs', type=int, default=5, help="O'lchovlar soni (mediana olinadi)")
+    parser.add_argument('--top', type=int, default=10, help="Ko'rsatiladigan eng sekin modullar soni")
+    parser.add_argument('--max-ms', type=float, help="Import vaqti chegarasi (mediana, ms)")
+    parser.add_argument('--max-rss-mb', type=float, help="Importdan keyingi xotira chegarasi (MB)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    work_dir = tempfile.mkdtemp(prefix='inv-startup-')
+    # Haqiqiy bazaga tegmaslik uchun; birinchi ishga tushirish jadvallarni yaratadi (o'lchovga kirmaydi)
+    env['INVENTORY_DATABASE_URI'] = 'sqlite:///' + os.path.join(work_dir, 'startup.db')
+    run_probe(env)
+
+    samples = [run_probe(env)[0] for _ in range(args.runs)]
+    _, importtime_output = run_probe(env, importtime=True)
+
+    import_ms = statistics.median(sample['import_ms'] for sample in samples)
+    rss_mb = statistics.median(sample['rss_mb'] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample['loaded']})
+
+    print(f"import app: {import_ms:.0f} ms (mediana, {args.runs} ta o'lchov)")
+    print(f"RSS:        {rss_mb:.1f} MB")
+    print("\nEng sekin modullar (kumulyativ):")
+    for cumulative_ms, name in slowest_imports(importtime_output, args.top):
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    failures = []
+    if loaded:
+        failures.append(f"import paytida yuklangan og'ir kutubxonalar: {', '.join(loaded)}")
+    if args.max_ms is not None and import_ms > args.max_ms:
+        failures.append(f"import vaqti {import_ms:.0f} ms > {args.max_ms:.0f} ms")
+    if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+        failures.append(f"xotira {rss_mb:.1f} MB > {args.max_rss_mb:.1f} MB")
+
+    if failures:
+        print("\nXATO: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"\nOK: {', '.join(LAZY_MODULES)} import paytida yuklanmaydi")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Gunicorn sozlamalari (production rejim, Linux/Mac)
+
+inv_launcher.py --mode production shu faylni ishlatadi; to'g'ridan-to'g'ri ham
+ishga tushirish mumkin:
+    gunicorn app:app
+Buyruq qatoridagi parametrlar (--workers, --bind, ...) bu yerdagilardan ustun.
+
+Yumshoq qayta ishga tushirish: master jarayonga SIGHUP yuborilsa, yangi
+ishchilar ishga tushadi, eskilari joriy so'rovlarni tugatib yopiladi.
+preload_app tufayli SIGHUP kodni qayta yuklamaydi - kod yangilanganda
+serverni to'liq qayta ishga tushiring.
+"""
+
+import os
+
+bind = '0.0.0.0:5000'
+workers = os.cpu_count() or 1
+worker_class = 'gthread'
+threads = 4
+keepalive = 5  # Bo'sh keep-alive ulanishni yopishdan oldin kutish (s)
+timeout = 120  # Katta Excel eksport / QR ZIP so'rovlari uchun
+graceful_timeout = 30  # Qayta ishga tushirishda joriy so'rovlarni tugatish uchun vaqt
+
+# Ilova master jarayonda bir marta yuklanadi: init_db (jadvallar, indekslar va
+# yarim qolgan import vazifalarini yopish) har bir ishchida qayta bajarilmaydi.
+# Aks holda yangi ishchi boshqa ishchida davom etayotgan importni "failed" qilib qo'yardi.
+# Chiqqan ishchining vazifalari child_exit da yopiladi.
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+def child_exit(server, worker):
+    """Ishchi chiqqanda (SIGHUP, graceful_timeout dan keyin o'ldirilganda ham) uning fon
+    import oqimlari ham to'xtaydi - vazifalari "running" holatida qolib ketmasligi kerak.
+    Master jarayonda, ishchi jarayoni tugagandan keyin chaqiriladi."""
+    from app import app, fail_interrupted_import_jobs, ImportJob
+    with app.app_context():
+        fail_interrupted_import_jobs(ImportJob.worker_pid == worker.pid)
+
+def post_fork(server, worker):
+    """Master jarayonda ochilgan SQLite ulanishlari ishchilar orasida bo'lishilmasligi kerak.
+    Har bir ishchining QR pool i yadrolarning o'z ulushini oladi (INVENTORY_QR_WORKERS berilmagan bo'lsa)."""
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
+    if 'INVENTORY_QR_WORKERS' not in os.environ:
+        app.config['QR_WORKERS'] = max(1, (os.cpu_count() or 1) // server.cfg.workers)
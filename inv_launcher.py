@@ -2,9 +2,17 @@
 """
 Inventarizatsiya Tizimi Launcher
 Bu fayl loyihani ishga tushirish uchun yaratilgan
+
+    python3 inv_launcher.py                      # dev rejim (Flask server)
+    python3 inv_launcher.py --mode production    # gunicorn / waitress
+    python3 inv_launcher.py --mode production --workers 4 --threads 8
 """
 
+import argparse
+import importlib.util
 import os
+import platform
+import signal
 import sys
 import subprocess
 import webbrowser
@@ -83,8 +91,88 @@ def install_dependencies():
         print(f"❌ Xatolik: {e}")
         return False
 
-def start_server():
-    """Server ishga tushirish"""
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 5000
+
+def parse_args():
+    """Buyruq qatori parametrlari"""
+    parser = argparse.ArgumentParser(description="Inventarizatsiya tizimini ishga tushirish")
+    parser.add_argument('--mode', choices=['dev', 'production'], default='dev',
+                        help="dev - Flask server (bitta jarayon), production - ko'p ishchili WSGI server")
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'waitress'], default='auto',
+                        help="production server (auto: Linux/Mac da gunicorn, Windows da waitress)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Ishchi jarayonlar soni (faqat gunicorn)")
+    parser.add_argument('--threads', type=int, default=4,
+                        help="Har bir ishchidagi oqimlar soni (waitress da umumiy oqimlar soni x ishchilar)")
+    parser.add_argument('--keep-alive', type=int,
+                        help="Bo'sh keep-alive ulanishni yopishdan oldin kutish, sekund "
+                             "(faqat gunicorn, standart gunicorn.conf.py dagi qiymat)")
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help="Qayta ishga tushirishda joriy so'rovlarni tugatish uchun vaqt, sekund")
+    parser.add_argument('--no-browser', action='store_true', help="Brauzerni avtomatik ochmaslik")
+    return parser.parse_args()
+
+def module_available(name):
+    """Kutubxona o'rnatilganligini tekshirish"""
+    return importlib.util.find_spec(name) is not None
+
+def choose_production_server(name):
+    """Production server tanlash: gunicorn Windows da ishlamaydi"""
+    if name == 'auto':
+        if platform.system() != 'Windows' and module_available('gunicorn'):
+            return 'gunicorn'
+        if module_available('waitress'):
+            return 'waitress'
+        return None
+    
+    if name == 'gunicorn' and platform.system() == 'Windows':
+        print("❌ gunicorn Windows da ishlamaydi, --server waitress dan foydalaning")
+        return None
+    if not module_available(name):
+        print(f"❌ {name} topilmadi")
+        return None
+    return name
+
+def production_command(server, args):
+    """Production server buyrug'i"""
+    if server == 'gunicorn':
+        command = [
+            sys.executable, '-m', 'gunicorn', 'app:app',
+            '--config', 'gunicorn.conf.py',
+            '--bind', f'{args.host}:{args.port}',
+            '--workers', str(args.workers),
+            '--threads', str(args.threads),
+            '--graceful-timeout', str(args.graceful_timeout)
+        ]
+        if args.keep_alive is not None:
+            command += ['--keep-alive', str(args.keep_alive)]
+        return command
+    
+    # waitress: bitta jarayon, oqimlar soni ishchilar x oqimlar. Keep-alive sozlamasi yo'q
+    # (channel-timeout - har qanday ulanishning harakatsizlik chegarasi, standart qiymatida qoladi)
+    return [
+        sys.executable, '-m', 'waitress',
+        f'--listen={args.host}:{args.port}',
+        f'--threads={args.workers * args.threads}',
+        'app:app'
+    ]
+
+def open_browser(args):
+    """Brauzerda ochish"""
+    if args.no_browser:
+        return
+    time.sleep(2)
+    try:
+        webbrowser.open(f'http://localhost:{args.port}')
+        print("🌐 Brauzerda ochildi!")
+    except:
+        print(f"⚠️  Brauzer avtomatik ochilmadi. Qo'lda oching: http://localhost:{args.port}")
+
+def start_server(args):
+    """Server ishga tushirish (dev rejim)"""
     print("🚀 Inventarizatsiya tizimini ishga tushirish...")
     
     # Python executable topish
@@ -96,7 +184,7 @@ def start_server():
     # Server ishga tushirish
     try:
         print("📡 Server ishga tushirilmoqda...")
-        print("🌐 Brauzerda ochish: http://localhost:5000")
+        print(f"🌐 Brauzerda ochish: http://localhost:{args.port}")
         print("⏹️  To'xtatish uchun: Ctrl+C")
         print("-" * 50)
         
@@ -104,16 +192,11 @@ def start_server():
         process = subprocess.Popen([
             python_executable, 
             "-c", 
-            "import app; app.app.run(debug=False, host='0.0.0.0', port=5000)"
+            f"import app; app.app.run(debug=False, host={args.host!r}, port={args.port})"
         ])
         
         # Brauzerda ochish
-        time.sleep(2)
-        try:
-            webbrowser.open('http://localhost:5000')
-            print("🌐 Brauzerda ochildi!")
-        except:
-            print("⚠️  Brauzer avtomatik ochilmadi. Qo'lda oching: http://localhost:5000")
+        open_browser(args)
         
         # Server ishga tushguncha kutish
         process.wait()
@@ -128,8 +211,84 @@ def start_server():
     
     return True
 
+def start_production_server(args):
+    """Production server: gunicorn (ko'p jarayon + oqimlar) yoki waitress (ko'p oqim)
+
+    SIGHUP (Linux/Mac) gunicorn da yumshoq qayta ishga tushiradi: signal masterga uzatiladi
+    (yangi ishchilar ko'tariladi, eskilari joriy so'rovlarni tugatadi). waitress da esa
+    qattiq qayta ishga tushirish: jarayon to'xtatiladi va qaytadan ishga tushiriladi,
+    joriy so'rovlar uziladi (waitress so'rovlarni kutib yopishni qo'llab-quvvatlamaydi).
+    SIGTERM/Ctrl+C serverni to'xtatadi.
+    """
+    server = choose_production_server(args.server)
+    if server is None:
+        print("📦 Production server uchun o'rnating:")
+        if platform.system() == "Windows":
+            print("   pip install waitress")
+        else:
+            print("   pip install gunicorn")
+        return False
+    if server == 'waitress' and args.keep_alive is not None:
+        print("❌ --keep-alive faqat gunicorn uchun: waitress da keep-alive sozlamasi yo'q")
+        return False
+    
+    command = production_command(server, args)
+    state = {'process': None, 'restart': False, 'stop': False}
+    
+    def start():
+        state['process'] = subprocess.Popen(command)
+    
+    def handle_restart(signum, frame):
+        if server == 'gunicorn':
+            print("🔄 Server yumshoq qayta ishga tushirilmoqda...")
+            state['process'].send_signal(signal.SIGHUP)
+        else:
+            print("🔄 Server qayta ishga tushirilmoqda (joriy so'rovlar uziladi)...")
+            state['restart'] = True
+            state['process'].terminate()
+    
+    def handle_stop(signum, frame):
+        state['stop'] = True
+        state['process'].terminate()
+    
+    print(f"🚀 Production rejim: {server}")
+    if server == 'gunicorn':
+        keep_alive = f"{args.keep_alive} s" if args.keep_alive is not None else "gunicorn.conf.py"
+        print(f"   ishchilar: {args.workers}, oqimlar: {args.threads}, keep-alive: {keep_alive}")
+    else:
+        print(f"   oqimlar: {args.workers * args.threads}")
+    print(f"🌐 Brauzerda ochish: http://localhost:{args.port}")
+    print("⏹️  To'xtatish uchun: Ctrl+C")
+    if hasattr(signal, 'SIGHUP'):
+        kind = "Yumshoq qayta ishga tushirish" if server == 'gunicorn' else "Qayta ishga tushirish (joriy so'rovlar uziladi)"
+        print(f"🔄 {kind}: kill -HUP {os.getpid()}")
+    print("-" * 50)
+    
+    start()
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, handle_restart)
+    signal.signal(signal.SIGTERM, handle_stop)
+    open_browser(args)
+    
+    try:
+        while True:
+            state['process'].wait()
+            if state['restart'] and not state['stop']:
+                state['restart'] = False
+                start()
+                continue
+            break
+    except KeyboardInterrupt:
+        # Ctrl+C butun jarayonlar guruhiga yuboriladi - server o'zi to'xtaydi
+        print("\n⏹️  Server to'xtatildi")
+        state['process'].wait()
+    
+    return state['process'].returncode in (0, -signal.SIGTERM)
+
 def main():
     """Asosiy funksiya"""
+    args = parse_args()
+    
     print("=" * 60)
     print("🏢 INVENTARIZATSIYA TIZIMI LAUNCHER")
     print("=" * 60)
@@ -145,7 +304,10 @@ def main():
         return
     
     # Server ishga tushirish
-    start_server()
+    if args.mode == 'production':
+        start_production_server(args)
+    else:
+        start_server(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,51 @@
+"""
+QR kod rasmlarini chizish
+
+Bu modul ataylab Flask ilovasini import qilmaydi: QR kodlarni parallel
+chizadigan ishchi jarayonlar faqat shu modulni yuklaydi (ma'lumotlar bazasi
+va ilova sozlamalarisiz).
+"""
+
+import io
+
+# qrcode (va PIL) birinchi QR kod chizilganda yuklanadi - ilovani ishga tushirishni sekinlashtirmaydi
+
+# QR kod parametrlari (40x30mm qog'oz uchun optimallashtirilgan)
+QR_RENDER_PARAMS = {
+    'version': 3,   # Kattaroq versiya (ko'p ma'lumot uchun)
+    'box_size': 2,  # Kichikroq box_size (ko'p ma'lumot uchun)
+    'border': 1     # Minimal border
+}
+
+def render_qr_png(qr_text):
+    """QR kod rasmini PNG formatida yaratish"""
+    import qrcode
+    
+    qr = qrcode.QRCode(**QR_RENDER_PARAMS)
+    qr.add_data(qr_text)
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def render_qr_svg(qr_text):
+    """QR kod rasmini SVG formatida yaratish"""
+    import qrcode
+    import qrcode.image.svg
+    
+    qr = qrcode.QRCode(image_factory=qrcode.image.svg.SvgPathImage, **QR_RENDER_PARAMS)
+    qr.add_data(qr_text)
+    qr.make(fit=True)
+    
+    buffer = io.BytesIO()
+    qr.make_image().save(buffer)
+    return buffer.getvalue()
+
+# Format -> chizish funksiyasi
+QR_RENDERERS = {
+    'png': render_qr_png,
+    'svg': render_qr_svg
+}